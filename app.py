@@ -1,496 +1,305 @@
+"""Flask application factory and the main student-facing routes.
+
+Parsing lives in parsing.py and models in models.py so that importing either
+does not build an app. Use `create_app()` (or wsgi.py for servers).
+"""
+import json
 import os
-from flask import Flask, render_template, request, redirect, jsonify, session, url_for
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-import PyPDF2
-from dotenv import load_dotenv
 import re
-from math import ceil
-
-load_dotenv()
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-# Disable debug routes by default; set environment variable ENABLE_DEBUG_ROUTES=1 to enable
-app.config['ENABLE_DEBUG_ROUTES'] = os.getenv('ENABLE_DEBUG_ROUTES', '0') == '1'
-
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from flask import (
+    Flask, Blueprint, Response, current_app, render_template, request, redirect, jsonify, url_for,
+    stream_with_context
+)
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    db, User, Subject, StudyPlan, TopicProgress, DailyTask, UploadEvent, upgrade_schema, progress_key,
+    seed_topic_progress, progress_summary, materialize_daily_tasks, index_syllabus, find_similar_syllabus
+)
+from parsing import (
+    PARSER_VERSION, read_pdf_pages_cached, extract_plan_chapters, syllabus_minhash, chapters_to_json,
+    page_cache_path, generate_weekly_plan, schedule_daily_tasks, format_study_plan_html
+)
+# Kept importable from `app` for older scripts; new code should import from parsing
+from parsing import read_pdf, extract_chapters_and_topics  # noqa: F401
+from calendar_feed import feed_token, user_id_from_token, feed_etag, build_feed
+from profiling import init_profiling
+from commands import register_commands
+
+main_bp = Blueprint('main', __name__)
+
+UPLOAD_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
 login_manager.login_message = 'Please log in to access this page.'
-class User(db.Model, UserMixin):
-    __tablename__ = 'user'
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
-
-    subjects = db.relationship('Subject', backref='owner', lazy=True)
-
-    def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
-
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
 
-    def __repr__(self):
-        return f"<User {self.username}>"
 
+def load_config(app):
+    """Populate `app.config` from environment variables (see .env.example)."""
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
+    # Disable debug routes by default; set environment variable ENABLE_DEBUG_ROUTES=1 to enable
+    app.config['ENABLE_DEBUG_ROUTES'] = os.getenv('ENABLE_DEBUG_ROUTES', '0') == '1'
+    app.config['DUPLICATE_SIMILARITY'] = float(os.getenv('DUPLICATE_SIMILARITY', '0.8'))
+    app.config['DUPLICATE_MIN_UPLOADERS'] = int(os.getenv('DUPLICATE_MIN_UPLOADERS', '2'))
+    app.config['CALENDAR_FEED_MAX_AGE'] = int(os.getenv('CALENDAR_FEED_MAX_AGE', '900'))
+
+    # Admission control for PDF parsing on /upload (per process; see parse_limits)
+    app.config['SERVER_THREADS'] = int(os.getenv('SERVER_THREADS', '8'))
+    app.config['PARSE_RESERVED_THREADS'] = int(os.getenv('PARSE_RESERVED_THREADS', '2'))
+    app.config['PARSE_CONCURRENCY'] = int(os.getenv('PARSE_CONCURRENCY', str(os.cpu_count() or 2)))
+    app.config['PARSE_QUEUE_SIZE'] = int(os.getenv('PARSE_QUEUE_SIZE', '8'))
+    app.config['PARSE_QUEUE_TIMEOUT'] = float(os.getenv('PARSE_QUEUE_TIMEOUT', '10'))
+    app.config['PARSE_PER_USER'] = int(os.getenv('PARSE_PER_USER', '1'))
+    app.config['PARSE_RETRY_AFTER'] = int(os.getenv('PARSE_RETRY_AFTER', '15'))
+
+    # Server-Sent Events progress stream for uploads
+    app.config['UPLOAD_PROGRESS_TTL'] = float(os.getenv('UPLOAD_PROGRESS_TTL', '120'))
+    app.config['UPLOAD_PROGRESS_KEEPALIVE'] = float(os.getenv('UPLOAD_PROGRESS_KEEPALIVE', '15'))
+    app.config['UPLOAD_PROGRESS_POLL'] = float(os.getenv('UPLOAD_PROGRESS_POLL', '0.5'))
+    app.config['UPLOAD_PROGRESS_START_GRACE'] = float(os.getenv('UPLOAD_PROGRESS_START_GRACE', '5'))
+
+    # On-demand request profiling (see profiling.py)
+    app.config['ADMIN_USERS'] = {u.strip() for u in os.getenv('ADMIN_USERS', '').split(',') if u.strip()}
+    app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', '0') == '1'
+    app.config['PROFILE_EVERY_N'] = int(os.getenv('PROFILE_EVERY_N', '0'))
+    app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', 'profiles')
+    app.config['PROFILE_KEEP'] = int(os.getenv('PROFILE_KEEP', '200'))
+
+
+class ParseBusy(Exception):
+    """Raised when an upload cannot get a parse slot; `status` is the HTTP code to return."""
+
+    def __init__(self, message, status=503):
+        super().__init__(message)
+        self.status = status
+
+
+class ParseLimiter:
+    """Bound concurrent PDF parsing with a short wait queue and per-user limits.
+
+    At most `max_active` parses run at once and at most `max_waiting` requests
+    wait for a slot (up to `wait_timeout` seconds). Anything beyond that is
+    rejected immediately so login/dashboard requests keep their threads and CPU.
+    A user's queued and running uploads both count towards `per_user`.
+    """
 
-class Subject(db.Model):
-    __tablename__ = 'subject'
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    student_name = db.Column(db.String(120))
-    roll_number = db.Column(db.String(80))
-    subject_name = db.Column(db.String(200))
-    exam_date = db.Column(db.String(20))
-    priority = db.Column(db.String(20))
-    pdf_file = db.Column(db.String(400))
+    def __init__(self, max_active, max_waiting, wait_timeout, per_user):
+        self.max_active = max(1, max_active)
+        self.max_waiting = max(0, max_waiting)
+        self.wait_timeout = wait_timeout
+        self.per_user = max(1, per_user)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._in_flight = defaultdict(int)
+
+    def _release_user(self, user_id):
+        self._in_flight[user_id] -= 1
+        if self._in_flight[user_id] <= 0:
+            del self._in_flight[user_id]
+
+    @contextmanager
+    def slot(self, user_id):
+        with self._cond:
+            if self._in_flight.get(user_id, 0) >= self.per_user:
+                raise ParseBusy('You already have an upload in progress', status=429)
+            if self._active >= self.max_active and self._waiting >= self.max_waiting:
+                raise ParseBusy('Server is busy processing other uploads')
+            self._in_flight[user_id] += 1
+            self._waiting += 1
+            got_slot = self._cond.wait_for(lambda: self._active < self.max_active, self.wait_timeout)
+            self._waiting -= 1
+            if not got_slot:
+                self._release_user(user_id)
+                raise ParseBusy('Server is busy processing other uploads')
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._release_user(user_id)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {'active': self._active, 'waiting': self._waiting, 'users': len(self._in_flight)}
+
+
+class UploadProgress:
+    """Progress events for uploads, keyed by (user id, client upload id).
+
+    Events are rows in `upload_event`, so an SSE stream served by one worker
+    sees an upload handled by another. The upload request appends events as the
+    parsing pipeline advances; streams poll for new ones. An upload id can only
+    be started once (unique seq 1), so a resubmitted form is rejected instead of
+    parsing the same PDF again. Events older than `ttl` seconds are pruned. A
+    stream gives up after `start_grace` seconds if the upload has not started,
+    and after `ttl` seconds without a new event once it has.
+
+    Writes go through their own connection so they never commit (or wait on)
+    the upload request's session.
+    """
 
+    FINAL_STAGES = ('done', 'error')
 
-class StudyPlan(db.Model):
-    __tablename__ = 'study_plan'
-    id = db.Column(db.Integer, primary_key=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
-    plan_data = db.Column(db.Text)
+    def __init__(self, ttl, poll_interval, start_grace):
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.start_grace = start_grace
 
-    def __repr__(self):
-        return f"<StudyPlan subject_id={self.subject_id}>"
-@login_manager.user_loader
-def load_user(user_id):
-    """Flask-Login user loader. Returns None if `User` model is not yet defined or not found."""
-    try:
-        User = globals().get('User')
-        if User is None:
-            return None
-        # Prefer SQLAlchemy 2.0 style get if available
+    def start(self, user_id, upload_id):
+        """Record the upload's first ('queued') event and return a job to report on."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
         try:
-            return db.session.get(User, int(user_id))
-        except Exception:
-            return User.query.get(int(user_id))
-    except Exception:
-        return None
-def extract_chapters_and_topics(pdf_text: str):
-    """Extract unit/chapter headings, their hours and topic lists from PDF text.
-
-    This function uses heuristics to find lines that look like 'Unit 1', 'UNIT I',
-    'Chapter 1' etc., segments text between headers, and extracts bulleted/numbered
-    topics. It returns a list of chapters each with 'name', 'topics' and optional 'hours'.
+            with db.engine.begin() as conn:
+                conn.execute(db.delete(UploadEvent).where(UploadEvent.created_at < cutoff))
+                conn.execute(db.insert(UploadEvent).values(
+                    user_id=user_id, upload_id=upload_id, seq=1, stage='queued', data='{}',
+                    created_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            raise ParseBusy('This upload was already submitted', status=409)
+        return UploadJob(user_id, upload_id)
+
+    def events(self, user_id, upload_id, after=0, keepalive=15.0):
+        """Yield (seq, event) pairs after `after`, or (None, None) after `keepalive` idle seconds.
+
+        Stops after a final event, when the upload has not started within
+        `start_grace` seconds, or when nothing new arrives for `ttl` seconds.
+        """
+        query = (
+            db.select(UploadEvent.seq, UploadEvent.stage, UploadEvent.data)
+            .where(UploadEvent.user_id == user_id, UploadEvent.upload_id == upload_id)
+            .order_by(UploadEvent.seq)
+        )
+        last_event = last_sent = time.monotonic()
+        started = after > 0  # a reconnect has already seen the 'queued' event
+        while True:
+            with db.engine.connect() as conn:
+                rows = conn.execute(query.where(UploadEvent.seq > after)).all()
+            now = time.monotonic()
+            for seq, stage, data in rows:
+                after = seq
+                yield seq, dict(json.loads(data), stage=stage)
+                if stage in self.FINAL_STAGES:
+                    return
+            if rows:
+                started = True
+                last_event = last_sent = now
+            elif now - last_event >= (self.ttl if started else self.start_grace):
+                return
+            elif now - last_sent >= keepalive:
+                last_sent = now
+                yield None, None
+            time.sleep(self.poll_interval)
+
+
+class StreamLimiter:
+    """Cap open progress streams per process and per user.
+
+    parse_limits() budgets one stream thread per admitted upload, so streams are
+    capped at the same numbers as uploads (active + waiting, and per user).
     """
-    chapters = []
-
-    if not pdf_text:
-        return chapters
 
-    # Normalize text and remove common page markers
-    try:
-        pdf_text = re.sub(r'-{2,}\s*Page\s*\d+\s*-{2,}', ' ', pdf_text, flags=re.IGNORECASE)
-    except Exception:
-        pass
+    def __init__(self, max_open, per_user):
+        self.max_open = max(1, max_open)
+        self.per_user = max(1, per_user)
+        self._lock = threading.Lock()
+        self._open = defaultdict(int)
+        self._total = 0
+
+    def acquire(self, user_id):
+        with self._lock:
+            if self._open.get(user_id, 0) >= self.per_user:
+                raise ParseBusy('Too many progress streams open', status=429)
+            if self._total >= self.max_open:
+                raise ParseBusy('Server is busy processing other uploads')
+            self._open[user_id] += 1
+            self._total += 1
+
+    def release(self, user_id):
+        with self._lock:
+            self._total -= 1
+            self._open[user_id] -= 1
+            if self._open[user_id] <= 0:
+                del self._open[user_id]
+
+
+class UploadJob:
+    """The upload request's handle for appending progress events after start()."""
+
+    def __init__(self, user_id, upload_id):
+        self.user_id = user_id
+        self.upload_id = upload_id
+        self.seq = 1
+        self.finished = False
+
+    def report(self, stage, **data):
+        if self.finished:
+            return
+        self.seq += 1
+        self.finished = stage in UploadProgress.FINAL_STAGES
+        with db.engine.begin() as conn:
+            conn.execute(db.insert(UploadEvent).values(
+                user_id=self.user_id, upload_id=self.upload_id, seq=self.seq, stage=stage,
+                data=json.dumps(data), created_at=datetime.utcnow()
+            ))
+
+
+def parse_limits(config):
+    """(max_active, max_waiting) for ParseLimiter, fitted to the worker's thread budget.
+
+    Each upload in flight occupies two threads (the POST and its progress
+    stream) and PARSE_RESERVED_THREADS stay free for everything else, so active
+    plus waiting uploads are capped at (SERVER_THREADS - reserved) // 2.
+    """
+    budget = max(1, (config['SERVER_THREADS'] - config['PARSE_RESERVED_THREADS']) // 2)
+    max_active = max(1, min(config['PARSE_CONCURRENCY'], budget))
+    max_waiting = max(0, min(config['PARSE_QUEUE_SIZE'], budget - max_active))
+    return max_active, max_waiting
 
-    # Normalize line endings and split into non-empty lines
-    lines = [ln.strip() for ln in re.split(r'\r?\n', pdf_text) if ln and ln.strip()]
 
-    # Heuristic patterns for headers
-    header_patterns = [
-        re.compile(r'^(Unit|UNIT|UNIT\b).*', re.IGNORECASE),
-        re.compile(r'^(Chapter|CHAPTER|CHAP\.)\b', re.IGNORECASE),
-        re.compile(r'^Module\b', re.IGNORECASE),
-        re.compile(r'^\bUnit\s+\d+\b', re.IGNORECASE)
-    ]
+def unique_upload_path(folder, filename):
+    """Return a path in `folder` for `filename` that does not overwrite an existing upload."""
+    base, ext = os.path.splitext(filename)
+    path = os.path.join(folder, filename)
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"{base}_{counter}{ext}")
+        counter += 1
+    return path
 
-    header_indices = []
-    for i, ln in enumerate(lines):
-        for pat in header_patterns:
-            if pat.search(ln):
-                header_indices.append((i, ln))
-                break
-
-    # Fallback searches for common header variants
-    if not header_indices:
-        for i, ln in enumerate(lines):
-            if re.search(r'\bUNIT\s+\d+\b', ln, re.IGNORECASE) or re.search(r'\bUnit\s+\d+[:\-]?', ln):
-                header_indices.append((i, ln))
-
-    if not header_indices:
-        for i, ln in enumerate(lines):
-            if re.match(r'^(Chapter|CHAPTER)\b', ln):
-                header_indices.append((i, ln))
-
-    # Segment text between headers
-    segments = []
-    if header_indices:
-        for idx, (pos, hdr) in enumerate(header_indices):
-            start = pos
-            end = header_indices[idx + 1][0] if idx + 1 < len(header_indices) else len(lines)
-            segments.append((hdr, lines[start + 1:end]))
-    else:
-        segments.append(('Course Content', lines))
-
-    # Parse each segment into a chapter/unit
-    for hdr, seg in segments:
-        name = re.sub(r'^(Unit|UNIT|Chapter|CHAPTER|Module)[:\.\-\s]*', '', hdr, flags=re.IGNORECASE).strip()
-        if not name:
-            name = hdr.strip()
-
-        # Try to find hours in header or first lines of segment
-        hours = None
-        head_block = hdr + ' ' + ' '.join(seg[:3])
-        m = re.search(r'(\d{1,2})\s*(?:hours|hrs|Hrs|Hours)', head_block, re.IGNORECASE)
-        if m:
-            hours = f"{m.group(1)} hours"
-
-        topics = []
-        capture = False
-        for ln in seg:
-            # Start capture after explicit 'Topics' or 'Syllabus' markers
-            if re.match(r'^(Topics|Syllabus|Course Content|Contents)[:\-]?', ln, re.IGNORECASE):
-                capture = True
-                parts = re.split(r'[:\-]\s*', ln, maxsplit=1)
-                if len(parts) > 1 and len(parts[1].strip()) > 3:
-                    extra = parts[1].strip()
-                    for p in re.split(r';|,\s(?=[A-Z])', extra):
-                        p = p.strip()
-                        if len(p) > 3:
-                            topics.append(p)
-                continue
-
-            if capture:
-                if re.match(r'^(Unit|UNIT|Chapter|CHAPTER|Module)\b', ln, re.IGNORECASE):
-                    break
-                if re.match(r'^[•\-\*\+→]\s+(.+)', ln) or re.match(r'^\d+[\.\)]\s+(.+)', ln) or re.match(r'^[a-zA-Z]\)\s+(.+)', ln):
-                    t = re.sub(r'^[•\-\*\+→\d\.\)\s]+', '', ln).strip()
-                    if len(t) > 2:
-                        topics.append(t)
-                    continue
-                if 5 < len(ln) < 160 and any(k in ln.lower() for k in ['introduction', 'overview', 'objective', 'learning', 'apply', 'practice', 'exercise', 'concept', 'topic', 'unit']):
-                    topics.append(ln)
-                    continue
 
-            else:
-                if re.match(r'^[•\-\*\+→]\s+(.+)', ln) or re.match(r'^\d+[\.\)]\s+(.+)', ln):
-                    t = re.sub(r'^[•\-\*\+→\d\.\)\s]+', '', ln).strip()
-                    if len(t) > 3:
-                        topics.append(t)
-
-        # Fallback: take first substantive lines if no explicit topics
-        if not topics:
-            for ln in seg:
-                if len(ln) > 12 and not re.match(r'^(Reference|Textbook|Books|CO-PO|Assessment|Outcome)', ln, re.IGNORECASE):
-                    topics.append(ln)
-                if len(topics) >= 12:
-                    break
-
-        # Clean duplicates preserving order
-        seen = set()
-        clean_topics = []
-        for t in topics:
-            t2 = re.sub(r'\s+', ' ', t).strip().rstrip('.,;:')
-            if t2 and t2.lower() not in seen:
-                clean_topics.append(t2)
-                seen.add(t2.lower())
-
-        chapter = {'name': name, 'topics': clean_topics}
-        if hours:
-            chapter['hours'] = hours
-
-        if chapter['topics'] or chapter.get('hours'):
-            chapters.append(chapter)
-
-    # Limit to reasonable number of chapters
-    if len(chapters) > 10:
-        chapters = chapters[:10]
-
-    return chapters
-
-def read_pdf(filepath, max_pages=50):
-    """Read text from a PDF file using PyPDF2, with per-page error handling."""
-    text_parts = []
+@login_manager.user_loader
+def load_user(user_id):
+    """Flask-Login user loader. Returns None if the user is not found."""
     try:
-        with open(filepath, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            num_pages = min(len(reader.pages), max_pages)
-            for i in range(num_pages):
-                try:
-                    page = reader.pages[i]
-                    page_text = page.extract_text() or ''
-                    text_parts.append(page_text)
-                except Exception:
-                    # skip problematic pages but continue
-                    continue
+        return db.session.get(User, int(user_id))
     except Exception:
-        return ''
-
-    return '\n'.join(p for p in text_parts if p)
-
-def calculate_days_until_exam(exam_date_str):
-    """Calculate days remaining until exam."""
-    try:
-        exam_date = datetime.strptime(exam_date_str, "%Y-%m-%d")
-        today = datetime.now()
-        delta = (exam_date - today).days
-        return max(1, delta)
-    except:
-        return 30
-
-def generate_weekly_plan(chapters, exam_date, priority):
-    """Generate a day-wise or weekly study plan based on exam date and chapters."""
-    
-    days_remaining = calculate_days_until_exam(exam_date)
-    weeks_remaining = max(1, days_remaining // 7)
-    
-    plan = {
-        'total_chapters': len(chapters),
-        'total_topics': sum(len(ch['topics']) for ch in chapters),
-        'days_remaining': days_remaining,
-        'weeks_remaining': weeks_remaining,
-        'priority': priority,
-        'weekly_schedule': []
-    }
-    
-    # Distribute chapters across weeks
-    chapters_per_week = max(1, ceil(len(chapters) / max(1, weeks_remaining)))
-    
-    week_num = 1
-    chapter_idx = 0
-    
-    for week in range(min(weeks_remaining, 12)):
-        week_data = {
-            'week': week_num,
-            'chapters': [],
-            'revision_focus': []
-        }
-        
-        # Assign chapters to this week
-        weeks_chapters = 0
-        while weeks_chapters < chapters_per_week and chapter_idx < len(chapters):
-            chapter = chapters[chapter_idx]
-            
-            # Calculate topics per day for this chapter
-            num_topics = len(chapter['topics'])
-            days_for_chapter = max(2, min(4, ceil(num_topics / 4)))
-            
-            week_data['chapters'].append({
-                'name': chapter['name'],
-                'topics': chapter['topics'][:12],  # Limit to 12 topics display
-                'all_topics_count': num_topics,
-                'study_days': days_for_chapter,
-                'daily_topics': ceil(num_topics / days_for_chapter) if days_for_chapter > 0 else 1,
-                'estimated_hours': days_for_chapter * 2
-            })
-            
-            chapter_idx += 1
-            weeks_chapters += 1
-        
-        # Add revision focus from previous weeks
-        if week_num > 1 and week_data['chapters']:
-            week_data['revision_focus'] = [ch['name'] for ch in week_data['chapters'][:1]]
-        
-        if week_data['chapters']:  # Only add week if it has chapters
-            plan['weekly_schedule'].append(week_data)
-        
-        week_num += 1
-    
-    # Add final revision week
-    plan['final_revision'] = {
-        'focus': 'Comprehensive Revision & Mock Tests',
-        'activities': [
-            f"Complete revision of all {len(chapters)} chapters",
-            "Practice with previous year papers",
-            "Identify and focus on weak areas",
-            "Full mock test (under exam conditions)",
-            "Quick review 1 day before exam",
-            "Get 8+ hours sleep before exam day"
-        ]
-    }
-    
-    return plan
-
-def format_study_plan_html(chapters, study_plan):
-    """Format the study plan as polished HTML."""
-    
-    html = f"""
-    <div class="study-plan-container">
-        <div class="plan-summary">
-            <h3>📊 Study Plan Overview</h3>
-            <div class="summary-grid">
-                <div class="summary-item">
-                    <span class="label">Total Chapters</span>
-                    <span class="value">{study_plan['total_chapters']}</span>
-                </div>
-                <div class="summary-item">
-                    <span class="label">Total Topics</span>
-                    <span class="value">{study_plan['total_topics']}</span>
-                </div>
-                <div class="summary-item">
-                    <span class="label">Days Until Exam</span>
-                    <span class="value">{study_plan['days_remaining']}</span>
-                </div>
-                <div class="summary-item">
-                    <span class="label">Priority</span>
-                    <span class="value">{study_plan['priority']}</span>
-                </div>
-            </div>
-            <p class="recommendation">📚 <strong>Recommended Study Time:</strong> 2-3 hours daily</p>
-        </div>
-
-        <div class="syllabus-structure">
-            <h3>📖 Syllabus Structure</h3>
-            <div class="chapters-container">
-    """
-    
-    for idx, chapter in enumerate(chapters, 1):
-        num_topics = len(chapter['topics'])
-        difficulty = "Hard" if num_topics > 15 else "Medium" if num_topics > 8 else "Easy"
-        
-        html += f"""
-                <div class="chapter-card">
-                    <div class="chapter-header">
-                        <h4>Chapter {idx}: {chapter['name']}</h4>
-                        <span class="difficulty-badge difficulty-{difficulty.lower()}">{difficulty}</span>
-                    </div>
-                    <p class="topic-count">📚 {num_topics} Topics</p>
-                    <div class="topics-list">
-                        <ul>
-        """
-        
-        # Show all topics
-        for topic in chapter['topics']:
-            # Limit topic text to reasonable length
-            topic_text = topic[:80] + "..." if len(topic) > 80 else topic
-            html += f"<li>{topic_text}</li>"
-        
-        html += """
-                        </ul>
-                    </div>
-                </div>
-        """
-    
-    html += """
-            </div>
-        </div>
+        return None
 
-        <div class="weekly-plan">
-            <h3>📅 Weekly Study Schedule</h3>
-            <div class="weeks-container">
-    """
-    
-    for week_data in study_plan['weekly_schedule']:
-        html += f"""
-                <div class="week-card">
-                    <h4>📍 Week {week_data['week']}</h4>
-        """
-        
-        for chapter in week_data['chapters']:
-            html += f"""
-                    <div class="chapter-study-week">
-                        <h5>{chapter['name']}</h5>
-                        <div class="study-details">
-                            <span class="detail-item">⏱️ {chapter['study_days']} days</span>
-                            <span class="detail-item">⏰ {chapter['estimated_hours']} hours total</span>
-                            <span class="detail-item">📝 {chapter['daily_topics']} topics/day</span>
-                        </div>
-                        <div class="topics-preview">
-                            <p><strong>Topics to Cover:</strong></p>
-                            <ul>
-            """
-            
-            # Show all topics in week view
-            for topic in chapter['topics']:
-                topic_text = topic[:70] + "..." if len(topic) > 70 else topic
-                html += f"<li>{topic_text}</li>"
-            
-            if chapter['all_topics_count'] > len(chapter['topics']):
-                html += f"<li><em class='additional'>... and {chapter['all_topics_count'] - len(chapter['topics'])} more topics</em></li>"
-            
-            html += """
-                            </ul>
-                        </div>
-                    </div>
-            """
-        
-        html += """
-                </div>
-        """
-    
-    # Final revision
-    html += f"""
-            </div>
-
-            <div class="final-revision-card">
-                <h4>🎯 Final Revision Week</h4>
-                <p><strong>{study_plan['final_revision']['focus']}</strong></p>
-                <ul class="revision-activities">
-    """
-    
-    for activity in study_plan['final_revision']['activities']:
-        html += f"<li>✓ {activity}</li>"
-    
-    html += """
-                </ul>
-            </div>
-        </div>
-
-        <div class="study-tips-section">
-            <h3>💡 Study Tips for Success</h3>
-            <div class="tips-grid">
-                <div class="tip-card">
-                    <h5>📚 Reading Strategy</h5>
-                    <ul>
-                        <li>Read chapter overview first</li>
-                        <li>Focus on key topics listed</li>
-                        <li>Make summary notes</li>
-                        <li>Highlight important concepts</li>
-                    </ul>
-                </div>
-                <div class="tip-card">
-                    <h5>⏱️ Time Management</h5>
-                    <ul>
-                        <li>Study 2-3 hours daily</li>
-                        <li>Take 45-min focused sessions</li>
-                        <li>10-minute breaks between sessions</li>
-                        <li>Follow the weekly schedule</li>
-                    </ul>
-                </div>
-                <div class="tip-card">
-                    <h5>✍️ Practice & Review</h5>
-                    <ul>
-                        <li>Solve practice problems</li>
-                        <li>Use previous year papers</li>
-                        <li>Create formula/concept cards</li>
-                        <li>Revise daily for 15 min</li>
-                    </ul>
-                </div>
-                <div class="tip-card">
-                    <h5>🧠 Before Exam</h5>
-                    <ul>
-                        <li>Complete 3-4 mock tests</li>
-                        <li>Focus on weak topics</li>
-                        <li>Sleep 7-8 hours before exam</li>
-                        <li>Light review morning of exam</li>
-                    </ul>
-                </div>
-            </div>
-        </div>
-    </div>
-    """
-    
-    return html
 
 # ============== ROUTES ==============
 
-@app.route("/")
+@main_bp.route("/")
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard_home'))
+        return redirect(url_for('main.dashboard_home'))
     return render_template("index.html")
 
-@app.route("/register", methods=["GET", "POST"])
+@main_bp.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
         try:
@@ -526,7 +335,7 @@ def register():
             db.session.commit()
             
             login_user(user)
-            return redirect(url_for('dashboard_home'))
+            return redirect(url_for('main.dashboard_home'))
         
         except Exception as e:
             print(f"Register Error: {e}")
@@ -534,7 +343,7 @@ def register():
     
     return render_template("register.html")
 
-@app.route("/login", methods=["GET", "POST"])
+@main_bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         try:
@@ -554,7 +363,7 @@ def login():
             next_page = request.args.get('next')
             if next_page and next_page.startswith('/'):
                 return redirect(next_page)
-            return redirect(url_for('dashboard_home'))
+            return redirect(url_for('main.dashboard_home'))
         
         except Exception as e:
             print(f"Login Error: {e}")
@@ -562,25 +371,40 @@ def login():
     
     return render_template("login.html")
 
-@app.route("/logout")
+@main_bp.route("/logout")
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route("/dashboard")
+@main_bp.route("/dashboard")
 @login_required
 def dashboard_home():
     """Show user's subjects and quick actions."""
     subjects = Subject.query.filter_by(user_id=current_user.id).all()
-    return render_template("dashboard_home.html", subjects=subjects, user=current_user)
+    progress = progress_summary(current_user.id)
+    overall_total = sum(p['total'] for p in progress.values())
+    overall_completed = sum(p['completed'] for p in progress.values())
+    overall = {
+        'completed': overall_completed,
+        'total': overall_total,
+        'percent': round(100 * overall_completed / overall_total) if overall_total else 0
+    }
+    return render_template("dashboard_home.html", subjects=subjects, user=current_user,
+                           progress=progress, overall=overall)
 
-@app.route("/upload", methods=["GET", "POST"])
+@main_bp.route("/upload", methods=["GET", "POST"])
 @login_required
 def upload():
     if request.method == "GET":
         return render_template("upload.html")
     
+    job = None
+
+    def report(stage, **data):
+        if job is not None:
+            job.report(stage, **data)
+
     try:
         # Get form data
         student_name = request.form.get("student_name", "Student")
@@ -597,83 +421,212 @@ def upload():
         if not pdf or pdf.filename == '':
             return jsonify({'error': 'PDF file is required'}), 400
         
-        # Save PDF
-        filename = f"{current_user.id}_{pdf.filename.replace(' ', '_')}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        pdf.save(filepath)
+        # Optional client-chosen id for following progress over /upload/progress/<id>
+        upload_id = request.form.get("upload_id", "")
+        if upload_id and not UPLOAD_ID_RE.match(upload_id):
+            return jsonify({'error': 'Invalid upload id'}), 400
+        if upload_id:
+            job = current_app.extensions['upload_progress'].start(current_user.id, upload_id)
         
-        # Save to database (linked to current user)
-        subject = Subject(
-            user_id=current_user.id,
-            student_name=student_name,
-            roll_number=roll_number,
-            subject_name=subject_name,
-            exam_date=exam_date,
-            priority=priority,
-            pdf_file=filepath
-        )
-        db.session.add(subject)
-        db.session.commit()
+        # Parsing is CPU-heavy: wait for a slot or shed the request
+        with current_app.extensions['parse_limiter'].slot(current_user.id):
+            report('saving')
+            # Save PDF
+            filename = f"{current_user.id}_{pdf.filename.replace(' ', '_')}"
+            filepath = unique_upload_path(current_app.config['UPLOAD_FOLDER'], filename)
+            pdf.save(filepath)
         
-        # Extract text from PDF
-        pdf_text = read_pdf(filepath)
+            # Save to database (linked to current user)
+            subject = Subject(
+                user_id=current_user.id,
+                student_name=student_name,
+                roll_number=roll_number,
+                subject_name=subject_name,
+                exam_date=exam_date,
+                priority=priority,
+                pdf_file=filepath
+            )
+            db.session.add(subject)
+            db.session.commit()
         
-        if not pdf_text or len(pdf_text.strip()) < 30:
-            # Even if PDF is mostly empty, create a basic plan
-            print(f"Warning: PDF text extraction minimal, using fallback")
-            chapters = [{
-                'name': 'Study Material',
-                'topics': [
-                    'Introduction and Overview',
-                    'Core Concepts and Principles',
-                    'Key Topics and Content',
-                    'Practical Applications',
-                    'Review and Assessment'
-                ]
-            }]
-        else:
-            # Extract chapters and topics
-            chapters = extract_chapters_and_topics(pdf_text)
-            
-            # If extraction failed, use fallback
-            if not chapters or len(chapters) == 0:
-                chapters = [{
-                    'name': 'Extracted Content',
-                    'topics': [line for line in pdf_text.split('\n') if 10 < len(line) < 150][:15]
-                }]
+            # Extract text from PDF (page text is cached next to the upload)
+            pages = read_pdf_pages_cached(filepath)
+            pdf_text = '\n'.join(p for p in pages if p)
+            report('pages', pages=len(pages))
+            signature = syllabus_minhash(pdf_text)
         
-        # Generate study plan
-        study_plan = generate_weekly_plan(chapters, exam_date, priority)
+            # Reuse the chapter structure of a near-identical syllabus if one exists
+            match = None
+            if request.form.get("reuse_existing", "1") != "0":
+                match = find_similar_syllabus(signature, current_user.id)
+            if match:
+                chapters = match[2]
+            else:
+                chapters = extract_plan_chapters(pdf_text)
+            report('units', chapters=len(chapters), topics=sum(len(ch.topics) for ch in chapters),
+                   reused=bool(match))
         
-        # Format as HTML
-        plan_html = format_study_plan_html(chapters, study_plan)
+            # Generate study plan
+            start_date = date.today()
+            study_plan = generate_weekly_plan(chapters, exam_date, priority, start_date)
+            report('plan', weeks=len(study_plan.weekly_schedule))
         
-        # Save plan to database
-        study_plan_record = StudyPlan(
-            subject_id=subject.id,
-            plan_data=plan_html
-        )
-        db.session.add(study_plan_record)
-        db.session.commit()
+            # Format as HTML
+            plan_html = format_study_plan_html(chapters, study_plan)
+        
+            # Save plan to database
+            study_plan_record = StudyPlan(
+                subject_id=subject.id,
+                plan_data=plan_html,
+                parser_version=PARSER_VERSION,
+                chapters_data=chapters_to_json(chapters),
+                start_date=start_date
+            )
+            db.session.add(study_plan_record)
+            seed_topic_progress(subject, chapters)
+            materialize_daily_tasks(subject, schedule_daily_tasks(study_plan, start_date, exam_date))
+            index_syllabus(subject.id, signature)
+            db.session.commit()
         
-        return render_template("dashboard.html",
+        report('done', redirect=url_for('main.view_subject', subject_id=subject.id),
+               syllabus_match=round(match[1], 2) if match else None)
+        response = current_app.make_response(render_template("dashboard.html",
                              student_name=student_name,
                              subject_name=subject_name,
                              exam_date=exam_date,
-                             plan=plan_html)
+                             plan=plan_html,
+                             subject_id=subject.id,
+                             completed_topics=[],
+                             syllabus_match=match[1] if match else None))
+        if match:
+            response.headers['X-Syllabus-Match'] = f"{match[1]:.2f}"
+        return response
+    
+    except ParseBusy as e:
+        report('error', error=str(e))
+        if e.status == 409:
+            return jsonify({'error': str(e)}), 409
+        retry_after = current_app.config['PARSE_RETRY_AFTER']
+        response = jsonify({'error': f'{e} - please try again in {retry_after} seconds'})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, e.status
     
     except Exception as e:
         print(f"Upload Error: {e}")
+        db.session.rollback()
+        report('error', error='Processing failed')
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
-@app.route("/calendar")
+@main_bp.route("/upload/progress/<upload_id>")
+@login_required
+def upload_progress(upload_id):
+    """Server-Sent Events stream of an upload's processing stages.
+
+    Open it before POSTing the form with the same `upload_id`; reconnects resume
+    from the Last-Event-ID header.
+    """
+    if not UPLOAD_ID_RE.match(upload_id):
+        return jsonify({'error': 'Invalid upload id'}), 400
+    try:
+        after = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        after = 0
+    user_id = current_user.id
+    streams = current_app.extensions['progress_streams']
+    try:
+        streams.acquire(user_id)
+    except ParseBusy as e:
+        return jsonify({'error': str(e)}), e.status
+    events = current_app.extensions['upload_progress'].events(
+        user_id, upload_id, after, current_app.config['UPLOAD_PROGRESS_KEEPALIVE']
+    )
+
+    def stream():
+        yield 'retry: 2000\n\n'
+        for event_id, event in events:
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield f"id: {event_id}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+    # Keep the app context alive while streaming: events() polls the database
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    response.call_on_close(lambda: streams.release(user_id))
+    return response
+
+@main_bp.route("/calendar")
 @login_required
 def calendar():
     # Only show current user's subjects
     subjects = Subject.query.filter_by(user_id=current_user.id).all()
-    return render_template("calendar.html", subjects=subjects)
+    feed_url = url_for('main.calendar_feed',
+                       token=feed_token(current_app.config['SECRET_KEY'], current_user.id),
+                       _external=True)
+    return render_template("calendar.html", subjects=subjects, feed_url=feed_url)
+
+def ics_response(user):
+    """Serve a user's .ics feed, answering 304 from cached digests when the ETag matches."""
+    etag = feed_etag(user.id)
+    if etag is not None and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body, etag = build_feed(user.id, f"{user.username} - Study Plan")
+        response = current_app.response_class(body, mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="study-plan.ics"'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"private, max-age={current_app.config['CALENDAR_FEED_MAX_AGE']}"
+    return response
+
+@main_bp.route("/calendar.ics")
+@login_required
+def calendar_download():
+    return ics_response(current_user)
+
+@main_bp.route("/calendar/feed/<token>.ics")
+def calendar_feed(token):
+    """Subscription URL for calendar apps; the signed token stands in for a login."""
+    user_id = user_id_from_token(current_app.config['SECRET_KEY'], token)
+    user = db.session.get(User, user_id) if user_id is not None else None
+    if user is None:
+        return jsonify({'error': 'Unknown calendar feed'}), 404
+    return ics_response(user)
+
+@main_bp.route("/api/tasks")
+@login_required
+def tasks_in_range():
+    """Return the current user's daily study tasks between `start` and `end` (inclusive).
 
-@app.route("/subject/<int:subject_id>")
+    Dates are YYYY-MM-DD; `start` defaults to today and `end` to `start`.
+    """
+    try:
+        start = datetime.strptime(request.args.get('start', date.today().isoformat()), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get('end', start.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    if end < start:
+        return jsonify({'error': 'end must not be before start'}), 400
+    if (end - start).days > 366:
+        return jsonify({'error': 'Date range is limited to one year'}), 400
+
+    rows = (
+        db.session.query(DailyTask, Subject.subject_name)
+        .join(Subject, Subject.id == DailyTask.subject_id)
+        .filter(DailyTask.user_id == current_user.id,
+                DailyTask.task_date >= start,
+                DailyTask.task_date <= end)
+        .order_by(DailyTask.task_date, DailyTask.id)
+        .all()
+    )
+    tasks = []
+    for task, subject_name in rows:
+        item = task.to_dict()
+        item['subject_name'] = subject_name
+        tasks.append(item)
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'tasks': tasks})
+
+@main_bp.route("/subject/<int:subject_id>")
 @login_required
 def view_subject(subject_id):
     """View specific subject's study plan."""
@@ -685,14 +638,97 @@ def view_subject(subject_id):
     
     study_plan = StudyPlan.query.filter_by(subject_id=subject_id).first()
     plan_html = study_plan.plan_data if study_plan else "<p>No study plan generated yet.</p>"
+    completed_topics = [
+        [row.chapter, row.topic]
+        for row in TopicProgress.query.filter_by(subject_id=subject_id, completed=True).all()
+    ]
     
     return render_template("dashboard.html",
                          student_name=subject.student_name,
                          subject_name=subject.subject_name,
                          exam_date=subject.exam_date,
-                         plan=plan_html)
+                         plan=plan_html,
+                         subject_id=subject.id,
+                         completed_topics=completed_topics)
+
+def apply_progress_changes(wanted, subject_ids):
+    """Stage `wanted` {progress_key: completed} changes; returns how many were ignored."""
+    existing = {
+        (row.subject_id, row.chapter, row.topic): row
+        for row in TopicProgress.query.filter(TopicProgress.subject_id.in_(subject_ids))
+    }
+    # Subjects with a seeded checklist only accept their own topics; older
+    # plans without one get rows created on first tick.
+    seeded = {key[0] for key in existing}
+    ignored = 0
+    for key, completed in wanted.items():
+        row = existing.get(key)
+        if row is None and key[0] in seeded:
+            ignored += 1
+        elif row is None:
+            db.session.add(TopicProgress(
+                user_id=current_user.id,
+                subject_id=key[0],
+                chapter=key[1],
+                topic=key[2],
+                completed=completed
+            ))
+        elif row.completed != completed:
+            row.completed = completed
+    return ignored
+
+@main_bp.route("/progress", methods=["POST"])
+@login_required
+def update_progress():
+    """Apply a batch of topic state changes in a single transaction.
 
-@app.route("/subject/<int:subject_id>/delete", methods=["POST"])
+    Expects JSON: {"changes": [{"subject_id", "chapter", "topic", "completed"}, ...]}.
+    Later changes to the same topic win.
+    """
+    payload = request.get_json(silent=True) or {}
+    changes = payload.get('changes')
+    if not isinstance(changes, list) or not changes:
+        return jsonify({'error': 'changes must be a non-empty list'}), 400
+    if len(changes) > 2000:
+        return jsonify({'error': 'Too many changes in one request'}), 400
+
+    wanted = {}
+    try:
+        for change in changes:
+            key = progress_key(change['subject_id'], change['chapter'], change['topic'])
+            if not key[1] or not key[2]:
+                raise ValueError('chapter and topic are required')
+            wanted[key] = bool(change.get('completed', True))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid change: {e}'}), 400
+
+    subject_ids = {key[0] for key in wanted}
+    owned = {
+        sid for (sid,) in db.session.query(Subject.id)
+        .filter(Subject.id.in_(subject_ids), Subject.user_id == current_user.id)
+    }
+    if subject_ids - owned:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    # A first tick from two tabs on an unseeded plan can insert the same row
+    # twice; the loser retries once against the rows the other one created.
+    for attempt in range(2):
+        try:
+            ignored = apply_progress_changes(wanted, subject_ids)
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                return jsonify({'error': 'Progress changed concurrently, please retry'}), 409
+        except Exception as e:
+            db.session.rollback()
+            print(f"Progress Error: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    return jsonify({'success': True, 'applied': len(wanted) - ignored, 'ignored': ignored}), 200
+
+@main_bp.route("/subject/<int:subject_id>/delete", methods=["POST"])
 @login_required
 def delete_subject(subject_id):
     """Delete a subject (only if user owns it)."""
@@ -703,20 +739,23 @@ def delete_subject(subject_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        # Delete PDF file
-        if os.path.exists(subject.pdf_file):
-            os.remove(subject.pdf_file)
-        
-        # Delete from database
+        # Delete from database (plans, progress and index rows cascade)
+        pdf_file = subject.pdf_file
         db.session.delete(subject)
         db.session.commit()
         
+        # Delete PDF file and its page cache unless another subject still uses it
+        if pdf_file and not Subject.query.filter_by(pdf_file=pdf_file).first():
+            for path in (pdf_file, page_cache_path(pdf_file)):
+                if os.path.exists(path):
+                    os.remove(path)
+        
         return jsonify({'success': True, 'message': 'Subject deleted successfully'}), 200
     except Exception as e:
         print(f"Delete Error: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route("/test-plan")
+@main_bp.route("/test-plan")
 @login_required
 def test_plan():
     """Test route to generate a sample plan without PDF (for testing)."""
@@ -753,92 +792,49 @@ def test_plan():
                          plan=plan_html)
 
 
-@app.route('/_parse_test')
-def _parse_test():
-    """Debug route: parse PDFs in uploads/ and return detected units/topics."""
-    if not app.config.get('ENABLE_DEBUG_ROUTES'):
-        return jsonify({'success': False, 'error': 'Not Found'}), 404
+def create_app(config=None):
+    """Application factory. `config` overrides values loaded from the environment."""
+    load_dotenv()
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    max_active, max_waiting = parse_limits(app.config)
+    app.extensions['parse_limiter'] = ParseLimiter(
+        max_active=max_active,
+        max_waiting=max_waiting,
+        wait_timeout=app.config['PARSE_QUEUE_TIMEOUT'],
+        per_user=app.config['PARSE_PER_USER']
+    )
+    app.extensions['upload_progress'] = UploadProgress(
+        ttl=app.config['UPLOAD_PROGRESS_TTL'],
+        poll_interval=app.config['UPLOAD_PROGRESS_POLL'],
+        start_grace=app.config['UPLOAD_PROGRESS_START_GRACE']
+    )
+    app.extensions['progress_streams'] = StreamLimiter(
+        max_open=max_active + max_waiting,
+        per_user=app.config['PARSE_PER_USER']
+    )
+
+    app.register_blueprint(main_bp)
+    init_profiling(app)
+    if app.config['ENABLE_DEBUG_ROUTES']:
+        from debug_routes import debug_bp
+        app.register_blueprint(debug_bp)
+    register_commands(app)
+    return app
 
-    try:
-        files = [f for f in os.listdir(app.config['UPLOAD_FOLDER']) if f.lower().endswith('.pdf')][:10]
-        results = []
-        for f in files:
-            path = os.path.join(app.config['UPLOAD_FOLDER'], f)
-            txt = read_pdf(path)
-            ch = extract_chapters_and_topics(txt)
-            units = []
-            for c in ch:
-                units.append({'name': c.get('name'), 'topics': len(c.get('topics', [])), 'hours': c.get('hours')})
-            results.append({'file': f, 'units': units})
-        return jsonify({'success': True, 'results': results})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
-
-
-@app.route('/status')
-def status():
-    """Return simple server/process status helpful for troubleshooting connectivity."""
-    import subprocess, os, time
-    pid = os.getpid()
-    # Run netstat to show listeners for port 5000 (Windows)
-    try:
-        netout = subprocess.check_output('netstat -ano | findstr ":5000"', shell=True, text=True)
-        net_lines = [ln for ln in netout.splitlines() if ln.strip()]
-    except Exception as e:
-        net_lines = [f"netstat error: {e}"]
-
-    uploads_ok = os.path.exists(app.config.get('UPLOAD_FOLDER', 'uploads'))
-    pdf_count = 0
-    try:
-        pdf_count = len([f for f in os.listdir(app.config.get('UPLOAD_FOLDER', 'uploads')) if f.lower().endswith('.pdf')])
-    except Exception:
-        pdf_count = 0
-
-    if not app.config.get('ENABLE_DEBUG_ROUTES'):
-        return jsonify({'success': False, 'error': 'Not Found'}), 404
-
-    return jsonify({
-        'running': True,
-        'pid': pid,
-        'netstat': net_lines,
-        'host': request.host,
-        'uploads_folder_exists': uploads_ok,
-        'pdf_count': pdf_count,
-        'recommended_access_urls': ['http://127.0.0.1:5000', 'http://localhost:5000']
-    })
-
-
-@app.route('/create_test_user')
-def create_test_user():
-    """Temporary: create a test user (username: testuser, password: Test1234!) if it doesn't exist.
-
-    Remove this endpoint in production.
-    """
-    username = 'testuser'
-    email = 'test@example.com'
-    password = 'Test1234!'
-    if not app.config.get('ENABLE_DEBUG_ROUTES'):
-        return jsonify({'created': False, 'error': 'Not available'}), 404
-
-    try:
-        with app.app_context():
-            existing = User.query.filter_by(username=username).first()
-            if existing:
-                return jsonify({'created': False, 'reason': 'already exists', 'username': username})
-            user = User(username=username, email=email)
-            user.set_password(password)
-            db.session.add(user)
-            db.session.commit()
-            return jsonify({'created': True, 'username': username, 'password': password})
-    except Exception as e:
-        return jsonify({'created': False, 'error': str(e)})
 
 if __name__ == "__main__":
     print("Starting Flask app on http://127.0.0.1:5000 (or http://localhost:5000). If you cannot connect, try host='0.0.0.0' or check Windows firewall.")
     # Ensure database tables exist
+    app = create_app()
     try:
         with app.app_context():
-            db.create_all()
+            upgrade_schema()
     except Exception as e:
-        print('Warning: db.create_all() failed:', e)
+        print('Warning: upgrade_schema() failed:', e)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,163 @@
+"""Per-user iCalendar (.ics) feed of exam dates and daily study tasks.
+
+The feed is assembled from one cached VEVENT block per subject. A block is
+rebuilt only when its subject's daily tasks are re-materialized (new plan or
+reprocess) or it is missing, and the feed ETag is derived from the block
+digests, so a calendar client polling an unchanged feed costs one small query.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Subject, DailyTask, CalendarFeedBlock
+
+PRODID = '-//StudentStudy//AI Study Planner//EN'
+_TOKEN_SALT = 'calendar-feed'
+
+
+def feed_token(secret_key, user_id):
+    """Opaque token identifying a user's feed, for calendar apps that cannot log in."""
+    return URLSafeSerializer(secret_key, salt=_TOKEN_SALT).dumps(user_id)
+
+def user_id_from_token(secret_key, token):
+    """Return the user id for a feed token, or None if it is invalid."""
+    try:
+        return int(URLSafeSerializer(secret_key, salt=_TOKEN_SALT).loads(token))
+    except (BadSignature, TypeError, ValueError):
+        return None
+
+# ============== ICS RENDERING ==============
+
+def _escape(text):
+    return (str(text or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line):
+    """Fold a content line to 75 octets as RFC 5545 requires."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74  # continuation lines start with a space
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:  # do not split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    parts.append(data.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+def _event(uid, day, summary, description, stamp):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",
+        f'SUMMARY:{_escape(summary)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(ln) + '\r\n' for ln in lines)
+
+def render_subject_block(subject, tasks, stamp):
+    """VEVENTs for one subject: its exam date plus each study/revision task."""
+    events = []
+    try:
+        exam_day = datetime.strptime(subject.exam_date, '%Y-%m-%d').date()
+        events.append(_event(
+            f'exam-{subject.id}@studentstudy', exam_day,
+            f'📝 Exam: {subject.subject_name}', f'Priority: {subject.priority}', stamp
+        ))
+    except (TypeError, ValueError):
+        pass
+
+    per_day = {}
+    for task in tasks:
+        if task.kind == 'exam':
+            continue  # already covered by the exam event above
+        n = per_day[task.task_date] = per_day.get(task.task_date, 0) + 1
+        topics = json.loads(task.topics or '[]')
+        label = 'Revision' if task.kind == 'revision' else 'Study'
+        events.append(_event(
+            f"task-{subject.id}-{task.task_date.strftime('%Y%m%d')}-{n}@studentstudy", task.task_date,
+            f'📚 {label}: {subject.subject_name} - {task.chapter}',
+            '\n'.join(topics), stamp
+        ))
+    return ''.join(events)
+
+def wrap_calendar(blocks, name):
+    header = (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        f'PRODID:{PRODID}\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        'METHOD:PUBLISH\r\n'
+        f'{_fold("X-WR-CALNAME:" + _escape(name))}\r\n'
+    )
+    return header + ''.join(blocks) + 'END:VCALENDAR\r\n'
+
+# ============== CACHED FEED ==============
+
+def feed_etag(user_id):
+    """ETag of a user's feed from cached block digests, or None if any block is missing."""
+    rows = (
+        db.session.query(Subject.id, CalendarFeedBlock.digest)
+        .outerjoin(CalendarFeedBlock, CalendarFeedBlock.subject_id == Subject.id)
+        .filter(Subject.user_id == user_id)
+        .order_by(Subject.id)
+        .all()
+    )
+    if any(digest is None for _, digest in rows):
+        return None
+    return _combine(digest for _, digest in rows)
+
+def _combine(digests):
+    return hashlib.sha1('|'.join(digests).encode()).hexdigest()
+
+def build_feed(user_id, name):
+    """Return (ics_text, etag), rebuilding only the subject blocks that are missing.
+
+    If a concurrent request (say a phone and a laptop polling together) caches
+    the same block first, the insert hits the unique subject_id; roll back and
+    build again from the blocks it stored.
+    """
+    try:
+        return _build_feed(user_id, name)
+    except IntegrityError:
+        db.session.rollback()
+        return _build_feed(user_id, name)
+
+def _build_feed(user_id, name):
+    subjects = Subject.query.filter_by(user_id=user_id).order_by(Subject.id).all()
+    cached = {
+        block.subject_id: block
+        for block in CalendarFeedBlock.query.filter_by(user_id=user_id)
+    }
+
+    missing = [s for s in subjects if s.id not in cached]
+    if missing:
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        tasks_by_subject = {}
+        for task in (DailyTask.query
+                     .filter(DailyTask.subject_id.in_([s.id for s in missing]))
+                     .order_by(DailyTask.task_date, DailyTask.id)):
+            tasks_by_subject.setdefault(task.subject_id, []).append(task)
+        for subject in missing:
+            body = render_subject_block(subject, tasks_by_subject.get(subject.id, []), stamp)
+            block = CalendarFeedBlock(
+                subject_id=subject.id,
+                user_id=user_id,
+                digest=hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                body=body
+            )
+            db.session.add(block)
+            cached[subject.id] = block
+        db.session.commit()
+
+    blocks = [cached[s.id] for s in subjects]
+    return wrap_calendar([b.body for b in blocks], name), _combine(b.digest for b in blocks)
@@ -0,0 +1,255 @@
+"""Maintenance commands, registered on the app's `flask` CLI by create_app()."""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import (
+    db, Subject, StudyPlan, TopicProgress, SyllabusSignature, SyllabusBand, DailyTask, CalendarFeedBlock,
+    upgrade_schema, missing_schema, seed_topic_progress, materialize_daily_tasks, index_syllabus
+)
+from parsing import PARSER_VERSION, MINHASH_VERSION, rebuild_plan, chapters_to_json, page_cache_path
+
+
+def plan_start_dates(subject_ids):
+    """Start date of each subject's plan, so rebuilt schedules keep their place.
+
+    Plans saved before start_date was stored fall back to their first daily
+    task, then to today.
+    """
+    starts = dict(
+        db.session.query(StudyPlan.subject_id, StudyPlan.start_date)
+        .filter(StudyPlan.subject_id.in_(subject_ids), StudyPlan.start_date.isnot(None))
+    )
+    missing = [sid for sid in subject_ids if sid not in starts]
+    if missing:
+        starts.update(
+            db.session.query(DailyTask.subject_id, db.func.min(DailyTask.task_date))
+            .filter(DailyTask.subject_id.in_(missing))
+            .group_by(DailyTask.subject_id)
+        )
+    today = date.today()
+    return {sid: starts.get(sid) or today for sid in subject_ids}
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create missing tables and columns (safe to run on every deploy)."""
+    upgrade_schema()
+    click.echo('Database schema is up to date.')
+
+
+@click.command('reprocess-plans')
+@with_appcontext
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Parallel parser processes.')
+@click.option('--batch-size', type=int, default=100, show_default=True,
+              help='Subjects loaded and dispatched per batch.')
+@click.option('--limit', type=int, default=None, help='Stop after this many subjects.')
+def reprocess_plans(workers, batch_size, limit):
+    """Rebuild study plans generated by an older PARSER_VERSION (or MINHASH_VERSION).
+
+    Only chapter/topic extraction and plan generation are re-run; page text
+    comes from the cache stored next to each upload (PyPDF2 runs once for
+    uploads that predate the cache). Each subject is committed as soon as it
+    finishes, so an interrupted run resumes where it stopped.
+    """
+    upgrade_schema()
+    query = (
+        db.session.query(Subject.id)
+        .outerjoin(StudyPlan, StudyPlan.subject_id == Subject.id)
+        .outerjoin(SyllabusSignature, SyllabusSignature.subject_id == Subject.id)
+        .filter(db.or_(StudyPlan.id.is_(None),
+                       StudyPlan.parser_version.is_(None),
+                       StudyPlan.parser_version < PARSER_VERSION,
+                       SyllabusSignature.version < MINHASH_VERSION))
+        .order_by(Subject.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    subject_ids = [sid for (sid,) in query.distinct()]
+    click.echo(f"{len(subject_ids)} subject(s) outdated "
+               f"(parser version < {PARSER_VERSION} or signature version < {MINHASH_VERSION})")
+
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for start in range(0, len(subject_ids), batch_size):
+            batch = Subject.query.filter(Subject.id.in_(subject_ids[start:start + batch_size])).all()
+            subjects = {s.id: s for s in batch}
+            start_dates = plan_start_dates(list(subjects))
+            jobs = [(s.id, s.pdf_file, s.exam_date, s.priority, start_dates[s.id]) for s in batch]
+            futures = [pool.submit(rebuild_plan, job) for job in jobs]
+
+            for future in as_completed(futures):
+                subject_id, chapters, plan_html, tasks, signature, error = future.result()
+                if error:
+                    failed += 1
+                    click.echo(f"  subject {subject_id}: skipped ({error})")
+                    continue
+                try:
+                    subject = subjects[subject_id]
+                    record = StudyPlan.query.filter_by(subject_id=subject_id).first()
+                    if record is None:
+                        record = StudyPlan(subject_id=subject_id)
+                        db.session.add(record)
+                    record.plan_data = plan_html
+                    record.parser_version = PARSER_VERSION
+                    record.chapters_data = chapters_to_json(chapters)
+                    record.start_date = start_dates[subject_id]
+                    seed_topic_progress(subject, chapters)
+                    materialize_daily_tasks(subject, tasks)
+                    index_syllabus(subject_id, signature)
+                    db.session.commit()
+                    done += 1
+                except Exception as e:
+                    db.session.rollback()
+                    failed += 1
+                    click.echo(f"  subject {subject_id}: failed ({e})")
+            click.echo(f"  {done + failed}/{len(subject_ids)} processed")
+
+    click.echo(f"Reprocessed {done} subject(s), {failed} skipped or failed.")
+
+
+# Tables whose rows only make sense while their subject exists
+SUBJECT_CHILD_TABLES = [StudyPlan, TopicProgress, SyllabusSignature, SyllabusBand, DailyTask, CalendarFeedBlock]
+
+
+def _human(num_bytes):
+    size = float(num_bytes)
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _delete_orphan_rows(model, batch_size, dry_run):
+    """Delete rows of `model` whose subject no longer exists, `batch_size` rows per commit."""
+    orphans = (
+        db.session.query(model.id)
+        .filter(~model.subject_id.in_(db.session.query(Subject.id)))
+        .order_by(model.id)
+    )
+    if dry_run:
+        return orphans.count()
+
+    removed = 0
+    while True:
+        ids = [row_id for (row_id,) in orphans.limit(batch_size)]
+        if not ids:
+            return removed
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(ids)
+
+
+def _unreferenced_uploads(folder, min_age_seconds):
+    """Yield (path, size) for PDFs/page caches in `folder` that no subject references."""
+    referenced = set()
+    for (pdf_file,) in db.session.query(Subject.pdf_file).filter(Subject.pdf_file.isnot(None)):
+        referenced.add(os.path.abspath(pdf_file))
+        referenced.add(os.path.abspath(page_cache_path(pdf_file)))
+
+    cutoff = time.time() - min_age_seconds
+    for name in os.listdir(folder):
+        if not (name.lower().endswith('.pdf') or name.endswith('.pages.json.gz')):
+            continue
+        path = os.path.abspath(os.path.join(folder, name))
+        stat = os.stat(path)
+        # Recent files may belong to an upload whose subject is not committed yet
+        if path not in referenced and stat.st_mtime < cutoff:
+            yield path, stat.st_size
+
+
+def _sqlite_size(conn):
+    page_size = conn.exec_driver_sql('PRAGMA page_size').scalar()
+    page_count = conn.exec_driver_sql('PRAGMA page_count').scalar()
+    return page_size * page_count
+
+
+def _compact_sqlite(dry_run):
+    """Incrementally vacuum and analyze a SQLite database; returns bytes reclaimed."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        before = _sqlite_size(conn)
+        free_pages = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+        page_size = conn.exec_driver_sql('PRAGMA page_size').scalar()
+        if dry_run:
+            return free_pages * page_size
+
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            # Switching to incremental mode needs one full VACUUM; later runs stay incremental
+            click.echo("  enabling incremental auto_vacuum (one-time full VACUUM)")
+            conn.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.exec_driver_sql('VACUUM')
+        else:
+            conn.exec_driver_sql('PRAGMA incremental_vacuum')
+        conn.exec_driver_sql('ANALYZE')
+        return before - _sqlite_size(conn)
+
+
+@click.command('cleanup')
+@with_appcontext
+@click.option('--batch-size', type=int, default=500, show_default=True,
+              help='Orphaned rows deleted per transaction.')
+@click.option('--min-age', type=int, default=60, show_default=True,
+              help='Only remove unreferenced upload files older than this many minutes.')
+@click.option('--skip-files', is_flag=True, help='Do not touch the uploads folder.')
+@click.option('--skip-vacuum', is_flag=True, help='Do not VACUUM/ANALYZE the database.')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without changing anything.')
+def cleanup(batch_size, min_age, skip_files, skip_vacuum, dry_run):
+    """Remove orphaned plan data and unreferenced uploads, then compact the database.
+
+    Orphans are rows in study_plan, topic_progress, daily_task and the syllabus index whose
+    subject was deleted before deletes cascaded, plus PDFs and page caches in
+    the upload folder that no subject points to. A dry run never changes the
+    schema; it stops if init-db has not been run against this database yet.
+    """
+    if dry_run:
+        missing = missing_schema()
+        if missing:
+            raise click.ClickException(
+                f"database schema is out of date (missing: {', '.join(missing)}); "
+                "run `flask --app app init-db` first"
+            )
+    else:
+        upgrade_schema()
+    verb = 'would remove' if dry_run else 'removed'
+
+    for model in SUBJECT_CHILD_TABLES:
+        count = _delete_orphan_rows(model, max(1, batch_size), dry_run)
+        click.echo(f"{model.__tablename__}: {verb} {count} orphaned row(s)")
+
+    file_bytes = 0
+    if not skip_files:
+        folder = current_app.config['UPLOAD_FOLDER']
+        files = list(_unreferenced_uploads(folder, min_age * 60)) if os.path.isdir(folder) else []
+        for path, size in files:
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    click.echo(f"  could not remove {path}: {e}")
+                    continue
+            file_bytes += size
+        click.echo(f"uploads: {verb} {len(files)} unreferenced file(s), {_human(file_bytes)}")
+
+    db_bytes = 0
+    if not skip_vacuum:
+        if db.engine.dialect.name == 'sqlite':
+            db_bytes = _compact_sqlite(dry_run)
+            click.echo(f"database: {'reclaimable' if dry_run else 'reclaimed'} {_human(db_bytes)}")
+        else:
+            click.echo(f"database: skipping VACUUM for {db.engine.dialect.name}")
+
+    click.echo(f"Total space {'reclaimable' if dry_run else 'reclaimed'}: {_human(file_bytes + db_bytes)}")
+
+
+def register_commands(app):
+    app.cli.add_command(init_db)
+    app.cli.add_command(reprocess_plans)
+    app.cli.add_command(cleanup)
@@ -0,0 +1,82 @@
+"""Troubleshooting routes, only registered when ENABLE_DEBUG_ROUTES=1."""
+import os
+
+from flask import Blueprint, current_app, request, jsonify
+
+from models import db, User
+from parsing import read_pdf, extract_chapters_and_topics
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.route('/_parse_test')
+def _parse_test():
+    """Debug route: parse PDFs in uploads/ and return detected units/topics."""
+    try:
+        files = [f for f in os.listdir(current_app.config['UPLOAD_FOLDER']) if f.lower().endswith('.pdf')][:10]
+        results = []
+        for f in files:
+            path = os.path.join(current_app.config['UPLOAD_FOLDER'], f)
+            txt = read_pdf(path)
+            ch = extract_chapters_and_topics(txt)
+            units = []
+            for c in ch:
+                units.append({'name': c.get('name'), 'topics': len(c.get('topics', [])), 'hours': c.get('hours')})
+            results.append({'file': f, 'units': units})
+        return jsonify({'success': True, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@debug_bp.route('/status')
+def status():
+    """Return simple server/process status helpful for troubleshooting connectivity."""
+    import subprocess, os, time
+    pid = os.getpid()
+    # Run netstat to show listeners for port 5000 (Windows)
+    try:
+        netout = subprocess.check_output('netstat -ano | findstr ":5000"', shell=True, text=True)
+        net_lines = [ln for ln in netout.splitlines() if ln.strip()]
+    except Exception as e:
+        net_lines = [f"netstat error: {e}"]
+
+    uploads_ok = os.path.exists(current_app.config.get('UPLOAD_FOLDER', 'uploads'))
+    pdf_count = 0
+    try:
+        pdf_count = len([f for f in os.listdir(current_app.config.get('UPLOAD_FOLDER', 'uploads')) if f.lower().endswith('.pdf')])
+    except Exception:
+        pdf_count = 0
+
+    return jsonify({
+        'running': True,
+        'pid': pid,
+        'netstat': net_lines,
+        'host': request.host,
+        'uploads_folder_exists': uploads_ok,
+        'pdf_count': pdf_count,
+        'parse_limiter': current_app.extensions['parse_limiter'].stats(),
+        'recommended_access_urls': ['http://127.0.0.1:5000', 'http://localhost:5000']
+    })
+
+
+@debug_bp.route('/create_test_user')
+def create_test_user():
+    """Temporary: create a test user (username: testuser, password: Test1234!) if it doesn't exist.
+
+    Remove this endpoint in production.
+    """
+    username = 'testuser'
+    email = 'test@example.com'
+    password = 'Test1234!'
+    try:
+        with current_app.app_context():
+            existing = User.query.filter_by(username=username).first()
+            if existing:
+                return jsonify({'created': False, 'reason': 'already exists', 'username': username})
+            user = User(username=username, email=email)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            return jsonify({'created': True, 'username': username, 'password': password})
+    except Exception as e:
+        return jsonify({'created': False, 'error': str(e)})
@@ -0,0 +1,348 @@
+"""Database models and the query helpers shared by routes and commands."""
+import json
+from datetime import datetime
+
+from flask import current_app
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from parsing import PARSER_VERSION, MINHASH_VERSION, progress_text, is_heading_structure, lsh_buckets, minhash_similarity, chapters_from_json
+
+db = SQLAlchemy()
+
+
+class User(db.Model, UserMixin):
+    __tablename__ = 'user'
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128), nullable=False)
+
+    subjects = db.relationship('Subject', backref='owner', lazy=True)
+
+    def set_password(self, password: str):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password: str) -> bool:
+        return check_password_hash(self.password_hash, password)
+
+    def __repr__(self):
+        return f"<User {self.username}>"
+
+
+class Subject(db.Model):
+    __tablename__ = 'subject'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    student_name = db.Column(db.String(120))
+    roll_number = db.Column(db.String(80))
+    subject_name = db.Column(db.String(200))
+    exam_date = db.Column(db.String(20))
+    priority = db.Column(db.String(20))
+    pdf_file = db.Column(db.String(400))
+
+    # Deleting a subject removes everything derived from it
+    plans = db.relationship('StudyPlan', backref='subject', lazy=True, cascade='all, delete-orphan')
+    progress = db.relationship('TopicProgress', lazy=True, cascade='all, delete-orphan')
+    signature = db.relationship('SyllabusSignature', lazy=True, uselist=False, cascade='all, delete-orphan')
+    bands = db.relationship('SyllabusBand', lazy=True, cascade='all, delete-orphan')
+    tasks = db.relationship('DailyTask', lazy=True, cascade='all, delete-orphan')
+    feed_block = db.relationship('CalendarFeedBlock', lazy=True, uselist=False, cascade='all, delete-orphan')
+
+
+class StudyPlan(db.Model):
+    __tablename__ = 'study_plan'
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False)
+    plan_data = db.Column(db.Text)
+    parser_version = db.Column(db.Integer, default=0)
+    chapters_data = db.Column(db.Text)  # JSON list of extracted chapters
+    start_date = db.Column(db.Date)  # day week 1 of the plan starts; kept across rebuilds
+
+    def __repr__(self):
+        return f"<StudyPlan subject_id={self.subject_id}>"
+
+
+class TopicProgress(db.Model):
+    """Completion state of one plan topic, keyed by subject/chapter/topic."""
+    __tablename__ = 'topic_progress'
+    __table_args__ = (
+        db.UniqueConstraint('subject_id', 'chapter', 'topic', name='uq_topic_progress_key'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
+    chapter = db.Column(db.String(300), nullable=False)
+    topic = db.Column(db.String(300), nullable=False)
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TopicProgress subject_id={self.subject_id} completed={self.completed}>"
+
+
+class SyllabusSignature(db.Model):
+    """MinHash signature of a subject's syllabus text, used for near-duplicate detection."""
+    __tablename__ = 'syllabus_signature'
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, unique=True)
+    minhash = db.Column(db.Text, nullable=False)  # JSON list of MINHASH_PERMUTATIONS ints
+    version = db.Column(db.Integer, default=MINHASH_VERSION)  # parsing.MINHASH_VERSION it was built with
+
+    def __repr__(self):
+        return f"<SyllabusSignature subject_id={self.subject_id}>"
+
+
+class SyllabusBand(db.Model):
+    """One LSH band bucket of a signature; lookups hit the (band, bucket) index."""
+    __tablename__ = 'syllabus_band'
+    __table_args__ = (
+        db.Index('ix_syllabus_band_lookup', 'band', 'bucket'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
+    band = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+
+
+class DailyTask(db.Model):
+    """One day's work from a study plan, materialized so calendars can query by date."""
+    __tablename__ = 'daily_task'
+    __table_args__ = (
+        db.Index('ix_daily_task_user_date', 'user_id', 'task_date'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
+    task_date = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # study / revision / exam
+    chapter = db.Column(db.String(300))
+    topics = db.Column(db.Text)  # JSON list of topic strings
+    hours = db.Column(db.Float)
+
+    def to_dict(self):
+        return {
+            'date': self.task_date.isoformat(),
+            'subject_id': self.subject_id,
+            'kind': self.kind,
+            'chapter': self.chapter,
+            'topics': json.loads(self.topics or '[]'),
+            'hours': self.hours
+        }
+
+
+
+class CalendarFeedBlock(db.Model):
+    """Cached iCalendar VEVENTs for one subject; dropped whenever its tasks change."""
+    __tablename__ = 'calendar_feed_block'
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    digest = db.Column(db.String(40), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+
+
+
+class UploadEvent(db.Model):
+    """One progress event of an upload, shared by all server processes.
+
+    (user_id, upload_id, seq) is unique, so inserting seq 1 succeeds only for
+    the first submission of an upload id.
+    """
+    __tablename__ = 'upload_event'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    upload_id = db.Column(db.String(64), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    stage = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.Text, nullable=False, default='{}')  # JSON object
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'upload_id', 'seq', name='uq_upload_event_seq'),
+    )
+
+
+# Columns added after the first release. db.create_all() does not alter existing
+# tables, so upgrade_schema() adds any that are missing from an older database.
+ADDED_COLUMNS = [
+    ('study_plan', 'parser_version', 'INTEGER DEFAULT 0'),
+    ('study_plan', 'chapters_data', 'TEXT'),
+    ('study_plan', 'start_date', 'DATE'),
+    ('syllabus_signature', 'version', 'INTEGER DEFAULT 1'),
+]
+
+def missing_schema():
+    """Tables and ADDED_COLUMNS that upgrade_schema() would create, without changing anything."""
+    inspector = db.inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    missing = [name for name in db.metadata.tables if name not in tables]
+    for table, column, ddl in ADDED_COLUMNS:
+        if table in tables and column not in {c['name'] for c in inspector.get_columns(table)}:
+            missing.append(f'{table}.{column}')
+    return missing
+
+def upgrade_schema():
+    """Create missing tables and add columns listed in ADDED_COLUMNS."""
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+# ============== PROGRESS ==============
+
+def progress_key(subject_id, chapter, topic):
+    """Normalize a (subject, chapter, topic) triple to the stored progress key."""
+    return (int(subject_id), progress_text(chapter), progress_text(topic))
+
+def seed_topic_progress(subject, chapters):
+    """Make the subject's progress rows match the topics in `chapters`.
+
+    Missing topics get an incomplete row, topics no longer in the plan are
+    dropped and existing rows keep their completion state, so a rebuilt plan
+    does not reset a student's checklist. Rows are only staged in the session;
+    the caller commits them together with the study plan.
+    """
+    existing = {
+        (row.subject_id, row.chapter, row.topic): row
+        for row in TopicProgress.query.filter_by(subject_id=subject.id)
+    }
+    wanted = set()
+    for chapter in chapters:
+        for topic in chapter['topics']:
+            key = progress_key(subject.id, chapter['name'], topic)
+            if key in wanted:
+                continue
+            wanted.add(key)
+            if key not in existing:
+                db.session.add(TopicProgress(
+                    user_id=subject.user_id,
+                    subject_id=key[0],
+                    chapter=key[1],
+                    topic=key[2],
+                    completed=False
+                ))
+    for key, row in existing.items():
+        if key not in wanted:
+            db.session.delete(row)
+
+def progress_summary(user_id):
+    """Return {subject_id: {'completed', 'total', 'percent'}} using one grouped query."""
+    rows = (
+        db.session.query(
+            TopicProgress.subject_id,
+            db.func.count(TopicProgress.id),
+            db.func.sum(db.case((TopicProgress.completed.is_(True), 1), else_=0))
+        )
+        .filter(TopicProgress.user_id == user_id)
+        .group_by(TopicProgress.subject_id)
+        .all()
+    )
+    summary = {}
+    for subject_id, total, completed in rows:
+        completed = int(completed or 0)
+        summary[subject_id] = {
+            'completed': completed,
+            'total': total,
+            'percent': round(100 * completed / total) if total else 0
+        }
+    return summary
+
+# ============== DAILY TASKS ==============
+
+def materialize_daily_tasks(subject, tasks):
+    """Replace a subject's stored daily tasks with `tasks` (caller commits).
+
+    Also drops the subject's cached calendar feed block so it is rebuilt.
+    """
+    DailyTask.query.filter_by(subject_id=subject.id).delete()
+    CalendarFeedBlock.query.filter_by(subject_id=subject.id).delete()
+    if not tasks:
+        return
+    db.session.execute(db.insert(DailyTask), [
+        {
+            'user_id': subject.user_id,
+            'subject_id': subject.id,
+            'task_date': task['task_date'],
+            'kind': task['kind'],
+            'chapter': (task['chapter'] or '')[:300],
+            'topics': json.dumps(task['topics']),
+            'hours': task['hours']
+        }
+        for task in tasks
+    ])
+
+# ============== SYLLABUS INDEX ==============
+
+def index_syllabus(subject_id, signature):
+    """Stage the signature and its LSH buckets for a subject (caller commits)."""
+    SyllabusSignature.query.filter_by(subject_id=subject_id).delete()
+    SyllabusBand.query.filter_by(subject_id=subject_id).delete()
+    if signature is None:
+        return
+    db.session.add(SyllabusSignature(subject_id=subject_id, minhash=json.dumps(signature), version=MINHASH_VERSION))
+    for band, bucket in lsh_buckets(signature):
+        db.session.add(SyllabusBand(subject_id=subject_id, band=band, bucket=bucket))
+
+def find_similar_syllabus(signature, user_id, threshold=None):
+    """Find the most similar indexed syllabus whose stored chapters `user_id` may reuse.
+
+    The user's own subjects always qualify. Another user's structure is only
+    reused if it was built from unit/chapter headings and the identical
+    structure was produced for at least DUPLICATE_MIN_UPLOADERS other users,
+    so text specific to one student (cover pages, names, roll numbers) never
+    reaches someone else's plan, and a match does not reveal that one
+    particular person uploaded the document.
+
+    Returns (subject_id, similarity, chapters) or None.
+    """
+    if signature is None:
+        return None
+    threshold = current_app.config['DUPLICATE_SIMILARITY'] if threshold is None else threshold
+    min_uploaders = current_app.config['DUPLICATE_MIN_UPLOADERS']
+
+    conditions = [
+        db.and_(SyllabusBand.band == band, SyllabusBand.bucket == bucket)
+        for band, bucket in lsh_buckets(signature)
+    ]
+    candidates = db.session.query(SyllabusBand.subject_id).filter(db.or_(*conditions)).distinct()
+    rows = (
+        db.session.query(SyllabusSignature.subject_id, SyllabusSignature.minhash, StudyPlan.chapters_data,
+                         Subject.user_id)
+        .join(StudyPlan, StudyPlan.subject_id == SyllabusSignature.subject_id)
+        .join(Subject, Subject.id == SyllabusSignature.subject_id)
+        .filter(SyllabusSignature.subject_id.in_(candidates),
+                SyllabusSignature.version == MINHASH_VERSION,
+                StudyPlan.chapters_data.isnot(None),
+                StudyPlan.parser_version == PARSER_VERSION)
+        .all()
+    )
+
+    own = []
+    shared = {}  # chapters_data -> ([(similarity, subject_id)], {other user ids})
+    for subject_id, minhash, chapters_data, owner_id in rows:
+        similarity = minhash_similarity(signature, json.loads(minhash))
+        if similarity < threshold:
+            continue
+        if owner_id == user_id:
+            own.append((similarity, subject_id, chapters_data))
+            continue
+        matches, owners = shared.setdefault(chapters_data, ([], set()))
+        matches.append((similarity, subject_id))
+        owners.add(owner_id)
+
+    for chapters_data, (matches, owners) in shared.items():
+        if len(owners) >= min_uploaders:
+            chapters = chapters_from_json(chapters_data)
+            if is_heading_structure(chapters):
+                similarity, subject_id = max(matches)
+                own.append((similarity, subject_id, chapters_data))
+    if not own:
+        return None
+    similarity, subject_id, chapters_data = max(own)
+    return subject_id, similarity, chapters_from_json(chapters_data)
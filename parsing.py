@@ -0,0 +1,810 @@
+"""Syllabus parsing pipeline: PDF text, chapter/topic extraction and plan building.
+
+Nothing here needs a Flask app or database, so scripts and worker processes can
+import it cheaply. PyPDF2 is only imported the first time a PDF is read.
+"""
+import os
+import gzip
+import hashlib
+import json
+import re
+import sys
+import zlib
+from datetime import datetime, timedelta
+from math import ceil
+
+from markupsafe import escape
+
+# Bump whenever extract_chapters_and_topics / generate_weekly_plan change output,
+# then run `flask --app app reprocess-plans` to rebuild older plans.
+PARSER_VERSION = 2
+
+# Chapter/topic text is stored at most this long in topic_progress rows
+PROGRESS_TEXT_LIMIT = 300
+
+def progress_text(value):
+    """Normalize chapter or topic text the way topic_progress stores it."""
+    return str(value).strip()[:PROGRESS_TEXT_LIMIT]
+
+def preload():
+    """Import PyPDF2 up front, e.g. in a pre-fork server master before workers fork."""
+    import PyPDF2  # noqa: F401
+
+# ============== PLAN DATA MODEL ==============
+# Chapters and plans are small __slots__ classes instead of nested dicts. Topic
+# and chapter names are interned, so identical syllabi imported in bulk share
+# one copy of each string, and a week's schedule references its Chapter rather
+# than copying the topic list. to_dict() produces the old dict layout, which is
+# what gets stored (StudyPlan.chapters_data) and what older callers expect.
+
+class _Record:
+    """Read-only dict-style access (`rec['name']`, `rec.get('hours')`) for code written against dicts."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+
+class Chapter(_Record):
+    """A unit/chapter of a syllabus: name, interned topic strings and optional hours."""
+    __slots__ = ('name', 'topics', 'hours')
+
+    def __init__(self, name, topics, hours=None):
+        self.name = sys.intern(name)
+        self.topics = tuple(sys.intern(t) for t in topics)
+        self.hours = hours
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data.get('topics', []), data.get('hours'))
+
+    def to_dict(self):
+        data = {'name': self.name, 'topics': list(self.topics)}
+        if self.hours:
+            data['hours'] = self.hours
+        return data
+
+    def __repr__(self):
+        return f"<Chapter {self.name!r} topics={len(self.topics)}>"
+
+
+class ScheduledChapter(_Record):
+    """A chapter's slot in a study week; topic data is read through the shared Chapter."""
+    __slots__ = ('chapter', 'study_days', 'daily_topics', 'estimated_hours')
+
+    PREVIEW_TOPICS = 12  # topics listed per chapter in the weekly view
+
+    def __init__(self, chapter, study_days, daily_topics, estimated_hours):
+        self.chapter = chapter
+        self.study_days = study_days
+        self.daily_topics = daily_topics
+        self.estimated_hours = estimated_hours
+
+    @property
+    def name(self):
+        return self.chapter.name
+
+    @property
+    def topics(self):
+        return self.chapter.topics[:self.PREVIEW_TOPICS]
+
+    @property
+    def all_topics_count(self):
+        return len(self.chapter.topics)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'topics': list(self.topics),
+            'all_topics_count': self.all_topics_count,
+            'study_days': self.study_days,
+            'daily_topics': self.daily_topics,
+            'estimated_hours': self.estimated_hours
+        }
+
+
+class WeekPlan(_Record):
+    """One week of the schedule."""
+    __slots__ = ('week', 'chapters', 'revision_focus')
+
+    def __init__(self, week, chapters=(), revision_focus=()):
+        self.week = week
+        self.chapters = list(chapters)
+        self.revision_focus = tuple(revision_focus)
+
+    def to_dict(self):
+        return {
+            'week': self.week,
+            'chapters': [ch.to_dict() for ch in self.chapters],
+            'revision_focus': list(self.revision_focus)
+        }
+
+
+class Plan(_Record):
+    """A generated study plan: summary numbers, weekly schedule and final revision."""
+    __slots__ = ('total_chapters', 'total_topics', 'days_remaining', 'weeks_remaining',
+                 'priority', 'weekly_schedule', 'final_revision')
+
+    def __init__(self, total_chapters, total_topics, days_remaining, weeks_remaining, priority,
+                 weekly_schedule=None, final_revision=None):
+        self.total_chapters = total_chapters
+        self.total_topics = total_topics
+        self.days_remaining = days_remaining
+        self.weeks_remaining = weeks_remaining
+        self.priority = priority
+        self.weekly_schedule = weekly_schedule if weekly_schedule is not None else []
+        self.final_revision = final_revision
+
+    def to_dict(self):
+        return {
+            'total_chapters': self.total_chapters,
+            'total_topics': self.total_topics,
+            'days_remaining': self.days_remaining,
+            'weeks_remaining': self.weeks_remaining,
+            'priority': self.priority,
+            'weekly_schedule': [week.to_dict() for week in self.weekly_schedule],
+            'final_revision': {
+                'focus': self.final_revision['focus'],
+                'activities': list(self.final_revision['activities'])
+            }
+        }
+
+
+def as_chapters(chapters):
+    """Accept Chapter objects or old-style chapter dicts and return Chapter objects."""
+    return [ch if isinstance(ch, Chapter) else Chapter.from_dict(ch) for ch in chapters]
+
+def chapters_to_json(chapters):
+    """Serialize chapters to the stored JSON format (a list of chapter dicts)."""
+    return json.dumps([ch.to_dict() for ch in as_chapters(chapters)])
+
+def chapters_from_json(data):
+    """Load chapters stored by chapters_to_json()."""
+    return as_chapters(json.loads(data))
+
+def normalize_syllabus_lines(pdf_text: str):
+    """Strip page markers from PDF text and split it into non-empty, stripped lines."""
+    # Normalize text and remove common page markers
+    try:
+        pdf_text = re.sub(r'-{2,}\s*Page\s*\d+\s*-{2,}', ' ', pdf_text, flags=re.IGNORECASE)
+    except Exception:
+        pass
+
+    # Normalize line endings and split into non-empty lines
+    return [ln.strip() for ln in re.split(r'\r?\n', pdf_text) if ln and ln.strip()]
+
+def extract_chapters_and_topics(pdf_text: str):
+    """Extract unit/chapter headings, their hours and topic lists from PDF text.
+
+    This function uses heuristics to find lines that look like 'Unit 1', 'UNIT I',
+    'Chapter 1' etc., segments text between headers, and extracts bulleted/numbered
+    topics. It returns a list of chapters each with 'name', 'topics' and optional 'hours'.
+    """
+    chapters = []
+
+    if not pdf_text:
+        return chapters
+
+    lines = normalize_syllabus_lines(pdf_text)
+
+    # Heuristic patterns for headers
+    header_patterns = [
+        re.compile(r'^(Unit|UNIT|UNIT\b).*', re.IGNORECASE),
+        re.compile(r'^(Chapter|CHAPTER|CHAP\.)\b', re.IGNORECASE),
+        re.compile(r'^Module\b', re.IGNORECASE),
+        re.compile(r'^\bUnit\s+\d+\b', re.IGNORECASE)
+    ]
+
+    header_indices = []
+    for i, ln in enumerate(lines):
+        for pat in header_patterns:
+            if pat.search(ln):
+                header_indices.append((i, ln))
+                break
+
+    # Fallback searches for common header variants
+    if not header_indices:
+        for i, ln in enumerate(lines):
+            if re.search(r'\bUNIT\s+\d+\b', ln, re.IGNORECASE) or re.search(r'\bUnit\s+\d+[:\-]?', ln):
+                header_indices.append((i, ln))
+
+    if not header_indices:
+        for i, ln in enumerate(lines):
+            if re.match(r'^(Chapter|CHAPTER)\b', ln):
+                header_indices.append((i, ln))
+
+    # Segment text between headers
+    segments = []
+    if header_indices:
+        for idx, (pos, hdr) in enumerate(header_indices):
+            start = pos
+            end = header_indices[idx + 1][0] if idx + 1 < len(header_indices) else len(lines)
+            segments.append((hdr, lines[start + 1:end]))
+    else:
+        segments.append(('Course Content', lines))
+
+    # Parse each segment into a chapter/unit
+    for hdr, seg in segments:
+        name = re.sub(r'^(Unit|UNIT|Chapter|CHAPTER|Module)[:\.\-\s]*', '', hdr, flags=re.IGNORECASE).strip()
+        if not name:
+            name = hdr.strip()
+
+        # Try to find hours in header or first lines of segment
+        hours = None
+        head_block = hdr + ' ' + ' '.join(seg[:3])
+        m = re.search(r'(\d{1,2})\s*(?:hours|hrs|Hrs|Hours)', head_block, re.IGNORECASE)
+        if m:
+            hours = f"{m.group(1)} hours"
+
+        topics = []
+        capture = False
+        for ln in seg:
+            # Start capture after explicit 'Topics' or 'Syllabus' markers
+            if re.match(r'^(Topics|Syllabus|Course Content|Contents)[:\-]?', ln, re.IGNORECASE):
+                capture = True
+                parts = re.split(r'[:\-]\s*', ln, maxsplit=1)
+                if len(parts) > 1 and len(parts[1].strip()) > 3:
+                    extra = parts[1].strip()
+                    for p in re.split(r';|,\s(?=[A-Z])', extra):
+                        p = p.strip()
+                        if len(p) > 3:
+                            topics.append(p)
+                continue
+
+            if capture:
+                if re.match(r'^(Unit|UNIT|Chapter|CHAPTER|Module)\b', ln, re.IGNORECASE):
+                    break
+                if re.match(r'^[•\-\*\+→]\s+(.+)', ln) or re.match(r'^\d+[\.\)]\s+(.+)', ln) or re.match(r'^[a-zA-Z]\)\s+(.+)', ln):
+                    t = re.sub(r'^[•\-\*\+→\d\.\)\s]+', '', ln).strip()
+                    if len(t) > 2:
+                        topics.append(t)
+                    continue
+                if 5 < len(ln) < 160 and any(k in ln.lower() for k in ['introduction', 'overview', 'objective', 'learning', 'apply', 'practice', 'exercise', 'concept', 'topic', 'unit']):
+                    topics.append(ln)
+                    continue
+
+            else:
+                if re.match(r'^[•\-\*\+→]\s+(.+)', ln) or re.match(r'^\d+[\.\)]\s+(.+)', ln):
+                    t = re.sub(r'^[•\-\*\+→\d\.\)\s]+', '', ln).strip()
+                    if len(t) > 3:
+                        topics.append(t)
+
+        # Fallback: take first substantive lines if no explicit topics
+        if not topics:
+            for ln in seg:
+                if len(ln) > 12 and not re.match(r'^(Reference|Textbook|Books|CO-PO|Assessment|Outcome)', ln, re.IGNORECASE):
+                    topics.append(ln)
+                if len(topics) >= 12:
+                    break
+
+        # Clean duplicates preserving order
+        seen = set()
+        clean_topics = []
+        for t in topics:
+            t2 = re.sub(r'\s+', ' ', t).strip().rstrip('.,;:')
+            if t2 and t2.lower() not in seen:
+                clean_topics.append(t2)
+                seen.add(t2.lower())
+
+        if clean_topics or hours:
+            chapters.append(Chapter(name, clean_topics, hours))
+
+    # Limit to reasonable number of chapters
+    if len(chapters) > 10:
+        chapters = chapters[:10]
+
+    return chapters
+
+def read_pdf_pages(filepath, max_pages=50):
+    """Read per-page text from a PDF file using PyPDF2, with per-page error handling."""
+    import PyPDF2  # imported lazily: only upload/reprocess paths need it
+
+    pages = []
+    try:
+        with open(filepath, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            num_pages = min(len(reader.pages), max_pages)
+            for i in range(num_pages):
+                try:
+                    page = reader.pages[i]
+                    pages.append(page.extract_text() or '')
+                except Exception:
+                    # skip problematic pages but continue
+                    pages.append('')
+    except Exception:
+        return []
+
+    return pages
+
+def read_pdf(filepath, max_pages=50):
+    """Read text from a PDF file using PyPDF2, with per-page error handling."""
+    return '\n'.join(p for p in read_pdf_pages(filepath, max_pages) if p)
+
+def page_cache_path(filepath):
+    """Path of the compressed page-text cache stored next to an upload."""
+    return filepath + '.pages.json.gz'
+
+def save_page_cache(filepath, pages):
+    """Persist extracted page text next to the PDF so it never has to be re-read."""
+    try:
+        with gzip.open(page_cache_path(filepath), 'wt', encoding='utf-8') as f:
+            json.dump({'pages': pages}, f)
+    except Exception as e:
+        print(f"Warning: could not write page cache for {filepath}: {e}")
+
+def load_page_cache(filepath):
+    """Return cached page text for an upload, or None if there is no usable cache."""
+    try:
+        with gzip.open(page_cache_path(filepath), 'rt', encoding='utf-8') as f:
+            return json.load(f)['pages']
+    except Exception:
+        return None
+
+def read_pdf_pages_cached(filepath, max_pages=50):
+    """Per-page text from the cache, falling back to PyPDF2 and filling the cache."""
+    pages = load_page_cache(filepath)
+    if pages is None:
+        pages = read_pdf_pages(filepath, max_pages)
+        if pages:
+            save_page_cache(filepath, pages)
+    return pages
+
+def read_pdf_cached(filepath, max_pages=50):
+    """Read page text from the cache, falling back to PyPDF2 and filling the cache."""
+    return '\n'.join(p for p in read_pdf_pages_cached(filepath, max_pages) if p)
+
+# Chapter names produced when no unit/chapter headings were found. Their topics
+# are raw lines of the PDF (possibly a student's name or roll number), so such
+# structures are never shared with other users.
+FALLBACK_CHAPTER_NAMES = frozenset({'Study Material', 'Extracted Content', 'Course Content'})
+
+def is_heading_structure(chapters):
+    """True if every chapter came from a unit/chapter heading, not a raw-text fallback."""
+    return bool(chapters) and all(ch.name not in FALLBACK_CHAPTER_NAMES for ch in as_chapters(chapters))
+
+def extract_plan_chapters(pdf_text):
+    """Run chapter extraction with the fallbacks used when a syllabus is barely parseable."""
+    if not pdf_text or len(pdf_text.strip()) < 30:
+        # Even if PDF is mostly empty, create a basic plan
+        print(f"Warning: PDF text extraction minimal, using fallback")
+        return [Chapter('Study Material', [
+            'Introduction and Overview',
+            'Core Concepts and Principles',
+            'Key Topics and Content',
+            'Practical Applications',
+            'Review and Assessment'
+        ])]
+
+    chapters = extract_chapters_and_topics(pdf_text)
+
+    # If extraction failed, use fallback
+    if not chapters or len(chapters) == 0:
+        chapters = [Chapter(
+            'Extracted Content',
+            [line for line in pdf_text.split('\n') if 10 < len(line) < 150][:15]
+        )]
+    return chapters
+
+# ============== NEAR-DUPLICATE SYLLABUS DETECTION ==============
+# Syllabi are compared by the Jaccard similarity of their word shingles,
+# estimated with one-permutation MinHash: each shingle is hashed once, the hash
+# picks one of MINHASH_PERMUTATIONS bins and each bin keeps its minimum. This
+# costs one pass over the shingles instead of one per permutation. Signatures
+# are split into LSH bands so a lookup only touches subjects sharing at least
+# one band bucket instead of every upload.
+
+MINHASH_PERMUTATIONS = 64  # signature length (bins)
+LSH_BANDS = 16  # 16 bands x 4 rows: candidates start appearing around 50% similarity
+SHINGLE_WORDS = 4
+# Bump when the signature scheme changes; older signatures are ignored until
+# `reprocess-plans` rebuilds them.
+MINHASH_VERSION = 2
+
+_BIN_BITS = MINHASH_PERMUTATIONS.bit_length() - 1
+_BIN_MASK = MINHASH_PERMUTATIONS - 1
+_EMPTY_BIN_OFFSET = 1 << 32  # keeps densified values apart from real ones
+
+def syllabus_shingles(pdf_text):
+    """32-bit hashed word shingles over the normalized line stream of a syllabus."""
+    words = []
+    for ln in normalize_syllabus_lines(pdf_text or ''):
+        words.extend(re.findall(r'[a-z0-9]+', ln.lower()))
+    if len(words) < SHINGLE_WORDS:
+        return set()
+    shingles = zip(*(words[i:] for i in range(SHINGLE_WORDS)))
+    return {zlib.crc32(' '.join(s).encode()) for s in shingles}
+
+def syllabus_minhash(pdf_text):
+    """Return the MinHash signature of a syllabus, or None if it has too little text."""
+    shingles = syllabus_shingles(pdf_text)
+    if len(shingles) < 10:
+        return None
+    bins = [None] * MINHASH_PERMUTATIONS
+    for x in shingles:
+        x = (x * 0x9E3779B1) & 0xFFFFFFFF  # spread CRC bits before splitting off the bin
+        b, v = x & _BIN_MASK, x >> _BIN_BITS
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    # Densify: an empty bin borrows the next non-empty bin's value (with the
+    # distance added), so two similar syllabi fill their gaps the same way
+    filled = []
+    for b in range(MINHASH_PERMUTATIONS):
+        distance = 0
+        while bins[(b + distance) % MINHASH_PERMUTATIONS] is None:
+            distance += 1
+        value = bins[(b + distance) % MINHASH_PERMUTATIONS]
+        filled.append(value + distance * _EMPTY_BIN_OFFSET if distance else value)
+    return filled
+
+def lsh_buckets(signature):
+    """Yield (band, bucket) pairs; bucket is a signed 64-bit hash that fits SQLite INTEGER."""
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    for band in range(LSH_BANDS):
+        chunk = ','.join(str(v) for v in signature[band * rows:(band + 1) * rows])
+        digest = hashlib.blake2b(chunk.encode(), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+def minhash_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+def calculate_days_until_exam(exam_date_str, start_date=None):
+    """Calculate days remaining until exam, counted from now or from `start_date`.
+
+    A `start_date` is treated like "some time during that day", matching what a
+    plan generated on that day saw.
+    """
+    try:
+        exam_date = datetime.strptime(exam_date_str, "%Y-%m-%d")
+        if start_date is None:
+            delta = (exam_date - datetime.now()).days
+        else:
+            delta = (exam_date.date() - start_date).days - 1
+        return max(1, delta)
+    except:
+        return 30
+
+_REVISION_ACTIVITIES = (
+    "Practice with previous year papers",
+    "Identify and focus on weak areas",
+    "Full mock test (under exam conditions)",
+    "Quick review 1 day before exam",
+    "Get 8+ hours sleep before exam day"
+)
+
+def generate_weekly_plan(chapters, exam_date, priority, start_date=None):
+    """Generate a day-wise or weekly study plan based on exam date and chapters.
+
+    `start_date` (default today) is the day the plan starts; rebuilds pass the
+    original one so students keep their place in the schedule.
+    """
+    
+    chapters = as_chapters(chapters)
+    days_remaining = calculate_days_until_exam(exam_date, start_date)
+    weeks_remaining = max(1, days_remaining // 7)
+    
+    plan = Plan(
+        total_chapters=len(chapters),
+        total_topics=sum(len(ch.topics) for ch in chapters),
+        days_remaining=days_remaining,
+        weeks_remaining=weeks_remaining,
+        priority=priority
+    )
+    
+    # Distribute chapters across weeks
+    chapters_per_week = max(1, ceil(len(chapters) / max(1, weeks_remaining)))
+    
+    week_num = 1
+    chapter_idx = 0
+    
+    for week in range(min(weeks_remaining, 12)):
+        week_data = WeekPlan(week_num)
+        
+        # Assign chapters to this week
+        weeks_chapters = 0
+        while weeks_chapters < chapters_per_week and chapter_idx < len(chapters):
+            chapter = chapters[chapter_idx]
+            
+            # Calculate topics per day for this chapter
+            num_topics = len(chapter.topics)
+            days_for_chapter = max(2, min(4, ceil(num_topics / 4)))
+            
+            week_data.chapters.append(ScheduledChapter(
+                chapter,
+                study_days=days_for_chapter,
+                daily_topics=ceil(num_topics / days_for_chapter) if days_for_chapter > 0 else 1,
+                estimated_hours=days_for_chapter * 2
+            ))
+            
+            chapter_idx += 1
+            weeks_chapters += 1
+        
+        # Add revision focus from previous weeks
+        if week_num > 1 and week_data.chapters:
+            week_data.revision_focus = tuple(ch.name for ch in week_data.chapters[:1])
+        
+        if week_data.chapters:  # Only add week if it has chapters
+            plan.weekly_schedule.append(week_data)
+        
+        week_num += 1
+    
+    # Add final revision week
+    plan.final_revision = {
+        'focus': 'Comprehensive Revision & Mock Tests',
+        'activities': (f"Complete revision of all {len(chapters)} chapters",) + _REVISION_ACTIVITIES
+    }
+    
+    return plan
+
+def schedule_daily_tasks(plan, start_date, exam_date):
+    """Lay a plan's weekly schedule out as dated tasks, week 1 starting on `start_date`.
+
+    Each scheduled chapter gets `study_days` tasks with `daily_topics` topics
+    each. A week's tasks stay inside that week and before the exam: they take
+    consecutive days while they fit and are spread evenly (sharing days) when
+    they do not. Weeks that start on or after the exam are folded into the last
+    week that still has days. Final revision activities fill the free days just
+    before the exam, and the exam itself is the last task. Returns dicts ready
+    for DailyTask rows.
+    """
+    try:
+        exam_day = datetime.strptime(exam_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        exam_day = None
+
+    # (first day, number of days, scheduled chapters) for each week with study days left
+    windows = []
+    for week in plan.weekly_schedule:
+        week_start = start_date + timedelta(days=7 * (week.week - 1))
+        week_end = week_start + timedelta(days=7)
+        if exam_day is not None:
+            week_end = min(week_end, exam_day)
+        if week_end > week_start:
+            windows.append((week_start, (week_end - week_start).days, list(week.chapters)))
+        elif windows:
+            windows[-1][2].extend(week.chapters)
+
+    tasks = []
+    last_study_day = start_date - timedelta(days=1)
+    for week_start, num_days, entries in windows:
+        total = sum(entry.study_days for entry in entries)
+        slot = 0
+        for entry in entries:
+            topics = entry.chapter.topics
+            per_day = max(1, entry.daily_topics)
+            hours = entry.estimated_hours / max(1, entry.study_days)
+            for day in range(entry.study_days):
+                offset = slot if total <= num_days else slot * num_days // total
+                task_date = week_start + timedelta(days=offset)
+                tasks.append({
+                    'task_date': task_date,
+                    'kind': 'study',
+                    'chapter': entry.name,
+                    'topics': list(topics[day * per_day:(day + 1) * per_day]),
+                    'hours': hours
+                })
+                last_study_day = max(last_study_day, task_date)
+                slot += 1
+
+    if exam_day is None:
+        tasks.sort(key=lambda t: t['task_date'])
+        return tasks
+
+    # Walk back from the exam so the last activities land closest to it
+    activities = plan.final_revision['activities'] if plan.final_revision else ()
+    for days_before, activity in enumerate(reversed(activities), 1):
+        task_date = exam_day - timedelta(days=days_before)
+        if task_date <= last_study_day or task_date < start_date:
+            break
+        tasks.append({
+            'task_date': task_date,
+            'kind': 'revision',
+            'chapter': plan.final_revision['focus'],
+            'topics': [activity],
+            'hours': 2
+        })
+    if exam_day >= start_date:
+        tasks.append({'task_date': exam_day, 'kind': 'exam', 'chapter': 'Exam day', 'topics': [], 'hours': 0})
+
+    tasks.sort(key=lambda t: t['task_date'])
+    return tasks
+
+def format_study_plan_html(chapters, study_plan):
+    """Format the study plan as polished HTML."""
+    
+    html = f"""
+    <div class="study-plan-container">
+        <div class="plan-summary">
+            <h3>📊 Study Plan Overview</h3>
+            <div class="summary-grid">
+                <div class="summary-item">
+                    <span class="label">Total Chapters</span>
+                    <span class="value">{study_plan['total_chapters']}</span>
+                </div>
+                <div class="summary-item">
+                    <span class="label">Total Topics</span>
+                    <span class="value">{study_plan['total_topics']}</span>
+                </div>
+                <div class="summary-item">
+                    <span class="label">Days Until Exam</span>
+                    <span class="value">{study_plan['days_remaining']}</span>
+                </div>
+                <div class="summary-item">
+                    <span class="label">Priority</span>
+                    <span class="value">{study_plan['priority']}</span>
+                </div>
+            </div>
+            <p class="recommendation">📚 <strong>Recommended Study Time:</strong> 2-3 hours daily</p>
+        </div>
+
+        <div class="syllabus-structure">
+            <h3>📖 Syllabus Structure</h3>
+            <div class="chapters-container">
+    """
+    
+    for idx, chapter in enumerate(chapters, 1):
+        num_topics = len(chapter['topics'])
+        difficulty = "Hard" if num_topics > 15 else "Medium" if num_topics > 8 else "Easy"
+        
+        html += f"""
+                <div class="chapter-card">
+                    <div class="chapter-header">
+                        <h4>Chapter {idx}: {chapter['name']}</h4>
+                        <span class="difficulty-badge difficulty-{difficulty.lower()}">{difficulty}</span>
+                    </div>
+                    <p class="topic-count">📚 {num_topics} Topics</p>
+                    <div class="topics-list">
+                        <ul>
+        """
+        
+        # Show all topics
+        for topic in chapter['topics']:
+            # Limit topic text to reasonable length
+            topic_text = topic[:80] + "..." if len(topic) > 80 else topic
+            html += (f"<li data-chapter=\"{escape(progress_text(chapter['name']))}\" "
+                     f"data-topic=\"{escape(progress_text(topic))}\">{topic_text}</li>")
+        
+        html += """
+                        </ul>
+                    </div>
+                </div>
+        """
+    
+    html += """
+            </div>
+        </div>
+
+        <div class="weekly-plan">
+            <h3>📅 Weekly Study Schedule</h3>
+            <div class="weeks-container">
+    """
+    
+    for week_data in study_plan['weekly_schedule']:
+        html += f"""
+                <div class="week-card">
+                    <h4>📍 Week {week_data['week']}</h4>
+        """
+        
+        for chapter in week_data['chapters']:
+            html += f"""
+                    <div class="chapter-study-week">
+                        <h5>{chapter['name']}</h5>
+                        <div class="study-details">
+                            <span class="detail-item">⏱️ {chapter['study_days']} days</span>
+                            <span class="detail-item">⏰ {chapter['estimated_hours']} hours total</span>
+                            <span class="detail-item">📝 {chapter['daily_topics']} topics/day</span>
+                        </div>
+                        <div class="topics-preview">
+                            <p><strong>Topics to Cover:</strong></p>
+                            <ul>
+            """
+            
+            # Show all topics in week view
+            for topic in chapter['topics']:
+                topic_text = topic[:70] + "..." if len(topic) > 70 else topic
+                html += f"<li>{topic_text}</li>"
+            
+            if chapter['all_topics_count'] > len(chapter['topics']):
+                html += f"<li><em class='additional'>... and {chapter['all_topics_count'] - len(chapter['topics'])} more topics</em></li>"
+            
+            html += """
+                            </ul>
+                        </div>
+                    </div>
+            """
+        
+        html += """
+                </div>
+        """
+    
+    # Final revision
+    html += f"""
+            </div>
+
+            <div class="final-revision-card">
+                <h4>🎯 Final Revision Week</h4>
+                <p><strong>{study_plan['final_revision']['focus']}</strong></p>
+                <ul class="revision-activities">
+    """
+    
+    for activity in study_plan['final_revision']['activities']:
+        html += f"<li>✓ {activity}</li>"
+    
+    html += """
+                </ul>
+            </div>
+        </div>
+
+        <div class="study-tips-section">
+            <h3>💡 Study Tips for Success</h3>
+            <div class="tips-grid">
+                <div class="tip-card">
+                    <h5>📚 Reading Strategy</h5>
+                    <ul>
+                        <li>Read chapter overview first</li>
+                        <li>Focus on key topics listed</li>
+                        <li>Make summary notes</li>
+                        <li>Highlight important concepts</li>
+                    </ul>
+                </div>
+                <div class="tip-card">
+                    <h5>⏱️ Time Management</h5>
+                    <ul>
+                        <li>Study 2-3 hours daily</li>
+                        <li>Take 45-min focused sessions</li>
+                        <li>10-minute breaks between sessions</li>
+                        <li>Follow the weekly schedule</li>
+                    </ul>
+                </div>
+                <div class="tip-card">
+                    <h5>✍️ Practice & Review</h5>
+                    <ul>
+                        <li>Solve practice problems</li>
+                        <li>Use previous year papers</li>
+                        <li>Create formula/concept cards</li>
+                        <li>Revise daily for 15 min</li>
+                    </ul>
+                </div>
+                <div class="tip-card">
+                    <h5>🧠 Before Exam</h5>
+                    <ul>
+                        <li>Complete 3-4 mock tests</li>
+                        <li>Focus on weak topics</li>
+                        <li>Sleep 7-8 hours before exam</li>
+                        <li>Light review morning of exam</li>
+                    </ul>
+                </div>
+            </div>
+        </div>
+    </div>
+    """
+    
+    return html
+
+# ============== BATCH REPROCESSING ==============
+
+def rebuild_plan(job):
+    """Worker: rebuild one subject's chapters, plan HTML, daily tasks and MinHash from cached page text."""
+    subject_id, pdf_file, exam_date, priority, start_date = job
+    try:
+        pages = load_page_cache(pdf_file) if pdf_file else None
+        if pages is None:
+            # No usable cache: parse the PDF (and cache it) only if it still exists
+            if not pdf_file or not os.path.exists(pdf_file):
+                return subject_id, None, None, None, None, 'syllabus file missing'
+            pages = read_pdf_pages_cached(pdf_file)
+        pdf_text = '\n'.join(p for p in pages if p)
+        chapters = extract_plan_chapters(pdf_text)
+        study_plan = generate_weekly_plan(chapters, exam_date, priority, start_date)
+        plan_html = format_study_plan_html(chapters, study_plan)
+        tasks = schedule_daily_tasks(study_plan, start_date, exam_date)
+        return subject_id, chapters, plan_html, tasks, syllabus_minhash(pdf_text), None
+    except Exception as e:
+        return subject_id, None, None, None, None, str(e)
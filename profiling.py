@@ -0,0 +1,198 @@
+"""On-demand cProfile request profiling and the admin routes that expose it.
+
+Admins (usernames in ADMIN_USERS) can always profile a single request with the
+`X-Profile: 1` header; PROFILE_EVERY_N > 0 additionally profiles every Nth
+request while PROFILING_ENABLED is on. Both can be changed at runtime through
+POST /admin/profiling; the change is stored in PROFILE_DIR/settings.json so
+every worker process picks it up, not just the one that handled the POST.
+"""
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import time
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, jsonify, url_for, g, send_from_directory, abort
+from flask_login import login_required, current_user
+
+profiling_bp = Blueprint('profiling', __name__, url_prefix='/admin')
+
+_request_counter = itertools.count(1)
+
+SETTINGS_FILE = 'settings.json'
+
+# Parsed settings file per path, reused while its mtime/size are unchanged
+_settings_cache = {}
+
+def is_admin(user):
+    """True if `user` is logged in and listed in ADMIN_USERS."""
+    return bool(getattr(user, 'is_authenticated', False)) and user.username in current_app.config['ADMIN_USERS']
+
+def _settings_path():
+    return os.path.join(current_app.config['PROFILE_DIR'], SETTINGS_FILE)
+
+def sampling_settings():
+    """Return (enabled, every_n): the runtime settings file if present, else config."""
+    enabled = current_app.config['PROFILING_ENABLED']
+    every_n = current_app.config['PROFILE_EVERY_N']
+    path = _settings_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return enabled, every_n
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _settings_cache.get(path)
+    if cached is None or cached[0] != key:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            cached = (key, bool(data.get('enabled', enabled)), max(0, int(data.get('every_n', every_n))))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"Profile Settings Error: {e}")
+            return enabled, every_n
+        _settings_cache[path] = cached
+    return cached[1], cached[2]
+
+def _save_settings(enabled, every_n):
+    """Atomically write the runtime settings shared by all worker processes."""
+    path = _settings_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'enabled': enabled, 'every_n': every_n}, f)
+    os.replace(tmp, path)
+
+def _should_profile():
+    if request.endpoint in (None, 'static'):
+        return False
+    if request.headers.get('X-Profile') == '1' and is_admin(current_user):
+        return True
+    enabled, every_n = sampling_settings()
+    return enabled and every_n > 0 and next(_request_counter) % every_n == 0
+
+def _prune_profiles(directory):
+    """Keep only the newest PROFILE_KEEP profiles."""
+    files = sorted(f for f in os.listdir(directory) if f.endswith('.prof'))
+    for name in files[:max(0, len(files) - current_app.config['PROFILE_KEEP'])]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+def _start_profile():
+    if not _should_profile():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this process; skip this request
+        return
+    g.profiler = profiler
+    g.profile_started = time.perf_counter()
+
+def _finish_profile(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    elapsed_ms = int((time.perf_counter() - g.pop('profile_started')) * 1000)
+    try:
+        directory = current_app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{request.endpoint}_{elapsed_ms}ms_{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(directory, name))
+        _prune_profiles(directory)
+    except Exception as e:
+        print(f"Profile Error: {e}")
+
+@profiling_bp.route('/profiles')
+@login_required
+def list_profiles():
+    """Admin: list captured request profiles, newest first."""
+    if not is_admin(current_user):
+        return jsonify({'success': False, 'error': 'Not Found'}), 404
+
+    directory = current_app.config['PROFILE_DIR']
+    profiles = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith('.prof'):
+                stat = os.stat(os.path.join(directory, name))
+                profiles.append({
+                    'name': name,
+                    'size': stat.st_size,
+                    'created': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+                    'url': url_for('profiling.download_profile', name=name)
+                })
+    enabled, every_n = sampling_settings()
+    return jsonify({
+        'success': True,
+        'enabled': enabled,
+        'every_n': every_n,
+        'profiles': profiles
+    })
+
+@profiling_bp.route('/profiles/<path:name>')
+@login_required
+def download_profile(name):
+    """Admin: download a raw .prof file, or `?format=text` for a pstats summary."""
+    if not is_admin(current_user) or not name.endswith('.prof'):
+        abort(404)
+
+    directory = os.path.abspath(current_app.config['PROFILE_DIR'])
+    if request.args.get('format') == 'text':
+        path = os.path.join(directory, os.path.basename(name))
+        if not os.path.isfile(path):
+            abort(404)
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            valid = ', '.join(sorted(pstats.Stats.sort_arg_dict_default))
+            return jsonify({'success': False, 'error': f'sort must be one of: {valid}'}), 400
+        try:
+            limit = int(request.args.get('limit', 60))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({'success': False, 'error': 'limit must be a positive integer'}), 400
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return send_from_directory(directory, name, as_attachment=True)
+
+@profiling_bp.route('/profiling', methods=['POST'])
+@login_required
+def configure_profiling():
+    """Admin: change sampling at runtime, e.g. {"enabled": true, "every_n": 50}."""
+    if not is_admin(current_user):
+        return jsonify({'success': False, 'error': 'Not Found'}), 404
+
+    payload = request.get_json(silent=True) or {}
+    enabled, every_n = sampling_settings()
+    try:
+        if 'enabled' in payload:
+            enabled = bool(payload['enabled'])
+        if 'every_n' in payload:
+            every_n = max(0, int(payload['every_n']))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        _save_settings(enabled, every_n)
+    except OSError as e:
+        return jsonify({'success': False, 'error': f'Could not save profiling settings: {e}'}), 500
+    return jsonify({
+        'success': True,
+        'enabled': enabled,
+        'every_n': every_n
+    })
+
+
+def init_profiling(app):
+    """Install the profiling hooks and admin routes on `app`."""
+    app.before_request(_start_profile)
+    app.teardown_request(_finish_profile)
+    app.register_blueprint(profiling_bp)
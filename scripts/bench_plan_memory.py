@@ -0,0 +1,111 @@
+"""Compare memory held by plans built as nested dicts vs. the slotted classes.
+
+Simulates a batch import of many syllabi (several students per course) and
+measures the retained size of chapters + weekly plans with tracemalloc.
+
+Run from the project root: python scripts/bench_plan_memory.py [syllabi] [courses]
+"""
+import json
+import os
+import random
+import sys
+import tracemalloc
+from math import ceil
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parsing import chapters_from_json, calculate_days_until_exam, generate_weekly_plan  # noqa: E402
+
+
+def legacy_weekly_plan(chapters, exam_date, priority):
+    """The dict-based generate_weekly_plan as it was before the slotted model (baseline)."""
+    days_remaining = calculate_days_until_exam(exam_date)
+    weeks_remaining = max(1, days_remaining // 7)
+    plan = {
+        'total_chapters': len(chapters),
+        'total_topics': sum(len(ch['topics']) for ch in chapters),
+        'days_remaining': days_remaining,
+        'weeks_remaining': weeks_remaining,
+        'priority': priority,
+        'weekly_schedule': []
+    }
+    chapters_per_week = max(1, ceil(len(chapters) / max(1, weeks_remaining)))
+    chapter_idx = 0
+    for week in range(min(weeks_remaining, 12)):
+        week_data = {'week': week + 1, 'chapters': [], 'revision_focus': []}
+        while len(week_data['chapters']) < chapters_per_week and chapter_idx < len(chapters):
+            chapter = chapters[chapter_idx]
+            num_topics = len(chapter['topics'])
+            days_for_chapter = max(2, min(4, ceil(num_topics / 4)))
+            week_data['chapters'].append({
+                'name': chapter['name'],
+                'topics': chapter['topics'][:12],
+                'all_topics_count': num_topics,
+                'study_days': days_for_chapter,
+                'daily_topics': ceil(num_topics / days_for_chapter),
+                'estimated_hours': days_for_chapter * 2
+            })
+            chapter_idx += 1
+        if week > 0 and week_data['chapters']:
+            week_data['revision_focus'] = [ch['name'] for ch in week_data['chapters'][:1]]
+        if week_data['chapters']:
+            plan['weekly_schedule'].append(week_data)
+    plan['final_revision'] = {
+        'focus': 'Comprehensive Revision & Mock Tests',
+        'activities': [
+            f"Complete revision of all {len(chapters)} chapters",
+            "Practice with previous year papers",
+            "Identify and focus on weak areas",
+            "Full mock test (under exam conditions)",
+            "Quick review 1 day before exam",
+            "Get 8+ hours sleep before exam day"
+        ]
+    }
+    return plan
+
+
+def make_course(rng, course):
+    chapters = []
+    for c in range(rng.randint(5, 10)):
+        topics = [f"Course {course} unit {c} topic {t}: {'detailed concept ' * rng.randint(1, 4)}".strip()
+                  for t in range(rng.randint(8, 20))]
+        chapters.append({'name': f"{c + 1} Unit title for course {course} part {c}", 'topics': topics, 'hours': '8 hours'})
+    return json.dumps(chapters)
+
+
+def measure(build, stored):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(data) for data in stored]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    syllabi = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    courses = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(7)
+    course_json = [make_course(rng, i) for i in range(courses)]
+    # Each upload is parsed separately, so every syllabus starts with its own strings
+    stored = [course_json[i % courses] for i in range(syllabi)]
+    exam = '2030-01-01'
+
+    def build_dicts(data):
+        chapters = json.loads(data)
+        return chapters, legacy_weekly_plan(chapters, exam, 'Medium')
+
+    def build_slots(data):
+        chapters = chapters_from_json(data)
+        return chapters, generate_weekly_plan(chapters, exam, 'Medium')
+
+    dict_bytes = measure(build_dicts, stored)
+    slot_bytes = measure(build_slots, stored)
+    print(f"{syllabi} syllabi from {courses} distinct course(s)")
+    print(f"  nested dicts : {dict_bytes / 1e6:8.2f} MB")
+    print(f"  slotted      : {slot_bytes / 1e6:8.2f} MB  ({100 * (1 - slot_bytes / dict_bytes):.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
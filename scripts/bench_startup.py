@@ -0,0 +1,30 @@
+"""Measure import and app boot times, each in a fresh interpreter.
+
+Run from the project root: python scripts/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RUNS = 5
+
+CASES = [
+    ('import parsing', 'import parsing'),
+    ('from app import read_pdf', 'from app import read_pdf'),
+    ('create_app()', 'from app import create_app; create_app()'),
+    ('import wsgi (preload)', 'import wsgi'),
+]
+
+TIMER = (
+    "import time; t = time.perf_counter(); {code}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+for label, code in CASES:
+    times = []
+    for _ in range(RUNS):
+        out = subprocess.check_output([sys.executable, '-c', TIMER.format(code=code)], cwd=ROOT, text=True)
+        times.append(float(out.strip().splitlines()[-1]))
+    times.sort()
+    print(f"{label:28s} median {times[len(times) // 2]:7.1f} ms   min {times[0]:7.1f} ms")
@@ -0,0 +1,62 @@
+"""Check that daily tasks never land on or after the exam, for exams 0-60 days out.
+
+Also checks that every chapter of the plan still gets all of its study tasks
+and that no week's tasks spill into the following week.
+
+Run from the project root: python scripts/check_schedule.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parsing import Chapter, generate_weekly_plan, schedule_daily_tasks  # noqa: E402
+
+CHAPTERS = [Chapter(f'Unit {n}', [f'Topic {n}.{t}' for t in range(1, 3 + n % 5)]) for n in range(1, 9)]
+
+
+def check(days_out):
+    start = date.today()
+    exam_day = start + timedelta(days=days_out)
+    plan = generate_weekly_plan(CHAPTERS, exam_day.isoformat(), 'Medium')
+    tasks = schedule_daily_tasks(plan, start, exam_day.isoformat())
+    study = [t for t in tasks if t['kind'] != 'exam']
+    problems = []
+
+    late = [t['task_date'] for t in study if t['task_date'] >= exam_day or t['task_date'] < start]
+    if late:
+        problems.append(f'{len(late)} task(s) outside [today, exam): {sorted(set(late))[:3]}')
+    exams = [t for t in tasks if t['kind'] == 'exam']
+    if days_out >= 0 and [t['task_date'] for t in exams] != [exam_day]:
+        problems.append('exam task missing or misplaced')
+
+    if days_out > 0:
+        scheduled = sum(entry.study_days for week in plan.weekly_schedule for entry in week.chapters)
+        got = sum(1 for t in study if t['kind'] == 'study')
+        if got != scheduled:
+            problems.append(f'{got} study tasks for {scheduled} scheduled study days')
+    week_of = {entry.name: week.week for week in plan.weekly_schedule for entry in week.chapters}
+    last_week = max(week_of.values(), default=1)
+    for t in study:
+        if t['kind'] == 'study' and t['chapter'] in week_of:
+            week = min(week_of[t['chapter']], last_week)
+            if (t['task_date'] - start).days // 7 + 1 > week:
+                problems.append(f"{t['chapter']} spills past week {week} ({t['task_date']})")
+                break
+    return problems
+
+
+def main():
+    failures = 0
+    for days_out in list(range(0, 15)) + [21, 30, 45, 60]:
+        problems = check(days_out)
+        status = 'ok' if not problems else '; '.join(problems)
+        print(f'exam in {days_out:2d} day(s): {status}')
+        failures += bool(problems)
+    if failures:
+        raise SystemExit(f'{failures} case(s) failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Check that reused syllabus structures never carry another student's text.
+
+Indexes a few uploads in a throwaway database and asserts that:
+- a syllabus without unit headings (raw-line fallback) is never reused across
+  accounts, so one student's cover line cannot show up in another's plan;
+- a heading-based structure is only reused across accounts once enough other
+  students produced the identical structure;
+- students can always reuse their own earlier uploads.
+
+Run from the project root: python scripts/check_syllabus_reuse.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+from models import (  # noqa: E402
+    db, User, Subject, StudyPlan, upgrade_schema, index_syllabus, find_similar_syllabus
+)
+from parsing import PARSER_VERSION, extract_plan_chapters, syllabus_minhash, chapters_to_json  # noqa: E402
+
+TOPICS = '\n'.join(
+    f'{n}. {subject} {kind}'
+    for n, (subject, kind) in enumerate(
+        ((s, k) for s in ('arrays', 'linked lists', 'stacks', 'queues', 'trees', 'graphs', 'hashing', 'sorting')
+         for k in ('definitions and operations', 'implementation in C', 'complexity analysis', 'applications')), 1)
+)
+# Plain lines without numbering: extraction falls back to the first lines of the
+# text, cover line included
+NO_HEADINGS = 'Data Structures syllabus for semester three\n' + '\n'.join(
+    line.split('. ', 1)[1] for line in TOPICS.split('\n'))
+WITH_HEADINGS = '\n'.join(
+    f'UNIT {u} Part {u} of the course\nTopics:\n' + '\n'.join(TOPICS.split('\n')[u * 8 - 8:u * 8]) for u in range(1, 5)
+)
+
+
+def cover(name):
+    return f'Student {name} roll 19CS0{len(name)}2 phone 555{len(name) * 1234}\n'
+
+
+def upload(username, text):
+    """Index `text` as a new subject of `username`; return (match, chapters used)."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+    signature = syllabus_minhash(text)
+    match = find_similar_syllabus(signature, user.id)
+    chapters = match[2] if match else extract_plan_chapters(text)
+    subject = Subject(user_id=user.id, subject_name='DS', exam_date='2030-01-01', priority='Medium', pdf_file='x.pdf')
+    db.session.add(subject)
+    db.session.flush()
+    db.session.add(StudyPlan(subject_id=subject.id, chapters_data=chapters_to_json(chapters),
+                             parser_version=PARSER_VERSION))
+    index_syllabus(subject.id, signature)
+    db.session.commit()
+    return match, chapters
+
+
+def text_of(chapters):
+    return ' '.join([ch.name for ch in chapters] + [t for ch in chapters for t in ch.topics])
+
+
+def main():
+    failures = []
+
+    def check(ok, message):
+        print(('ok   ' if ok else 'FAIL ') + message)
+        if not ok:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'check.db')}",
+                          'DUPLICATE_SIMILARITY': 0.8, 'DUPLICATE_MIN_UPLOADERS': 2})
+        with app.app_context():
+            upgrade_schema()
+
+            upload('alice', cover('Alice Smith') + NO_HEADINGS)
+            match, chapters = upload('bob', cover('Bob Jones') + NO_HEADINGS)
+            check(match is None, 'raw-line fallback structure is not reused across accounts')
+            check('Alice' not in text_of(chapters), "Bob's plan has none of Alice's text")
+            upload('carol', cover('Carol White') + NO_HEADINGS)
+            match, _ = upload('dave', cover('Dave Brown') + NO_HEADINGS)
+            check(match is None, 'fallback structure stays private even with several uploaders')
+
+            upload('alice', cover('Alice Smith') + WITH_HEADINGS)
+            match, _ = upload('erin', cover('Erin Black') + WITH_HEADINGS)
+            check(match is None, 'a structure from a single other student is not reused')
+            match, chapters = upload('frank', cover('Frank Green') + WITH_HEADINGS)
+            check(match is not None, 'a structure confirmed by two other students is reused')
+            check(not any(n in text_of(chapters) for n in ('Alice', 'Erin', 'roll', 'phone')),
+                  'the reused structure has no student-specific text')
+
+            match, _ = upload('bob', cover('Bob Jones') + NO_HEADINGS)
+            check(match is not None, 'students can reuse their own earlier upload')
+
+    if failures:
+        raise SystemExit(f'{len(failures)} check(s) failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from app import read_pdf, extract_chapters_and_topics
+from parsing import read_pdf, extract_chapters_and_topics
 import os
 
 UP_DIR = os.path.join(os.path.dirname(__file__), '..', 'uploads')
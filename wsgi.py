@@ -0,0 +1,23 @@
+"""WSGI entry point for production servers.
+
+Pre-fork servers can build the app once in the master process and share it
+with workers via copy-on-write. Use threaded workers, since each upload
+progress stream (Server-Sent Events) holds a thread while it is open:
+
+    gunicorn --preload -w 4 -k gthread --threads 8 wsgi:app
+
+The schema is created/upgraded here before workers start (also available as
+`flask --app app init-db`). The engine's pool is disposed afterwards so no
+database connection is shared across the fork.
+"""
+import parsing
+from app import create_app
+from models import db, upgrade_schema
+
+# Load PyPDF2 in the master so workers do not pay for it on their first upload
+parsing.preload()
+
+app = create_app()
+with app.app_context():
+    upgrade_schema()
+    db.engine.dispose()